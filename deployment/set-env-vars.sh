@@ -52,6 +52,10 @@ UPLOAD_FOLDER=/tmp/uploads
 # Database
 DB_PATH=/app/data/chatbot.db
 
+# Rate limiter storage (defaults to per-process memory://)
+# Use Redis to share limits across Gunicorn workers
+# RATELIMIT_STORAGE_URL=redis://localhost:6379/0
+
 # Admin Password File
 ADMIN_PASSWORD_FILE=/app/config/admin_password.txt
 
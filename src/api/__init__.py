@@ -1,7 +1,7 @@
 """
 API package for Bedrock Knowledge Base Chatbot REST endpoints
 """
-from flask import Flask
+from flask import Flask, request
 from flask_limiter import Limiter
 
 # Import all route modules
@@ -27,10 +27,22 @@ def register_blueprints(app: Flask, limiter: Limiter):
     app.register_blueprint(history.bp)
     app.register_blueprint(health.bp)
     
+    # Health probes and static assets don't need rate-limit bookkeeping
+    limiter.exempt(health.health_check)
+    
+    @limiter.request_filter
+    def _skip_rate_limit():
+        return request.path == '/api/health' or request.path.startswith('/static/')
+    
     # Apply rate limiting to specific routes (after registration)
     limiter.limit("10 per minute")(chatbot.ask_question)
     limiter.limit("5 per minute")(admin.admin_authenticate)
     limiter.limit("20 per hour")(admin.upload_document)
+    limiter.limit("20 per hour")(admin.upload_document_stream)
+    
+    # Failed admin logins and in-flight questions are tracked in the limiter's storage
+    admin.init_login_throttle(limiter)
+    chatbot.ask_concurrency.init_storage(limiter)
 
 __all__ = ['register_blueprints', 'init_api_routes']
 
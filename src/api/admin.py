@@ -2,10 +2,12 @@
 Admin API routes
 """
 import os
-import time
+import uuid
+import logging
 import secrets
-from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, make_response
-from flask.sessions import SecureCookieSessionInterface
+from typing import Optional
+from flask import Blueprint, request, jsonify, session, redirect, url_for
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 
 try:
@@ -16,7 +18,8 @@ except ImportError:
     from ..config import ConfigManager
     from ..config.logging_config import get_logger
     from ..kb import BedrockKnowledgeBase
-from .utils import admin_required, allowed_file, sanitize_input
+from .utils import admin_required, accepts_json, allowed_file, sanitize_input, render_cached_template
+from .history import invalidate_sources_cache
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 logger = get_logger(__name__)
@@ -27,6 +30,47 @@ bedrock_kb = None
 UPLOAD_FOLDER = None
 MAX_FILE_SIZE = None
 
+# Shared with flask-limiter so failed-login counters live in the limiter's storage
+limiter = None
+MAX_FAILED_LOGINS = 5  # Failed attempts allowed per IP within the window
+FAILED_LOGIN_WINDOW = 60  # Seconds
+
+# Admin page URLs, resolved on first use (url_for needs an app context)
+_DASHBOARD_URL = None
+_LOGIN_URL = None
+
+# Resolved admin password file and its last-read contents, revalidated by mtime
+_pw_cache = {'path': None, 'mtime_ns': 0, 'value': None}
+
+
+def _resolve_password_file(password_file: str) -> str:
+    """Resolve the admin password file to an absolute path"""
+    # Use absolute path or relative to project root
+    if not os.path.isabs(password_file):
+        # Try relative to src directory first, then project root
+        src_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '..', password_file)
+        root_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '..', '..', password_file)
+        if os.path.exists(src_path):
+            password_file = src_path
+        elif os.path.exists(root_path):
+            password_file = root_path
+    return os.path.abspath(password_file)
+
+
+def _get_stored_password() -> Optional[str]:
+    """Return the stored admin password, re-reading the file only when it changes"""
+    try:
+        mtime_ns = os.stat(_pw_cache['path']).st_mtime_ns
+    except OSError:
+        return None
+    
+    if _pw_cache['value'] is None or mtime_ns != _pw_cache['mtime_ns']:
+        with open(_pw_cache['path'], 'r') as f:
+            _pw_cache['value'] = f.read().strip()
+        _pw_cache['mtime_ns'] = mtime_ns
+        logger.debug(f"Admin password loaded from {_pw_cache['path']}")
+    return _pw_cache['value']
+
 
 def init_admin(config_manager: ConfigManager, bedrock: BedrockKnowledgeBase, upload_folder: str, max_file_size: int):
     """Initialize admin routes with dependencies"""
@@ -35,15 +79,45 @@ def init_admin(config_manager: ConfigManager, bedrock: BedrockKnowledgeBase, upl
     bedrock_kb = bedrock
     UPLOAD_FOLDER = upload_folder
     MAX_FILE_SIZE = max_file_size
+    _pw_cache.update(
+        path=_resolve_password_file(config.get('ADMIN_PASSWORD_FILE', 'config/admin_password.txt')),
+        mtime_ns=0,
+        value=None
+    )
     logger.info(f"Admin routes initialized (upload_folder: {upload_folder}, max_size: {max_file_size / (1024*1024)}MB)")
 
 
+def _unique_filename(filename: str) -> Optional[str]:
+    """Sanitize an upload filename and add a random suffix so uploads never overwrite each other"""
+    filename = secure_filename(filename)
+    if not filename:
+        return None
+    name, ext = os.path.splitext(filename)
+    return f"{name}_{uuid.uuid4().hex[:12]}{ext.lower()}"
+
+
+def _resolve_admin_urls():
+    """Resolve the dashboard and login page URLs once"""
+    global _DASHBOARD_URL, _LOGIN_URL
+    if _DASHBOARD_URL is None:
+        _DASHBOARD_URL = url_for('admin.admin_dashboard')
+        _LOGIN_URL = url_for('admin.admin_login_page')
+
+
+def init_login_throttle(rate_limiter):
+    """Use the app's rate limiter storage for per-IP failed-login counters"""
+    global limiter
+    limiter = rate_limiter
+    logger.debug(f"Login throttle initialized ({MAX_FAILED_LOGINS} failures per {FAILED_LOGIN_WINDOW}s)")
+
+
 @bp.route('')
 def admin_login_page():
     """Admin login page"""
     if session.get('admin_logged_in'):
-        return redirect(url_for('admin.admin_dashboard'))
-    return render_template('admin_login.html')
+        _resolve_admin_urls()
+        return redirect(_DASHBOARD_URL)
+    return render_cached_template('admin_login.html')
 
 
 @bp.route('/login', methods=['POST'])
@@ -51,8 +125,14 @@ def admin_authenticate():
     """Admin authentication"""
     client_ip = request.remote_addr
     logger.info(f"Admin login attempt from {client_ip}")
+    failure_key = f"auth_fail:{client_ip}"
     
     try:
+        # Refuse immediately once an IP has too many recent failures
+        if limiter and limiter.storage.get(failure_key) >= MAX_FAILED_LOGINS:
+            logger.warning(f"Admin login blocked for {client_ip}: too many failed attempts")
+            return jsonify({'error': 'Too many failed login attempts. Try again later.'}), 429
+        
         data = request.get_json()
         if not data:
             logger.warning(f"Invalid login request from {client_ip}: Missing JSON body")
@@ -65,91 +145,54 @@ def admin_authenticate():
             logger.warning(f"Invalid password format from {client_ip}")
             return jsonify({'error': 'Invalid password'}), 400
         
-        # Read password from external file
-        password_file = config.get('ADMIN_PASSWORD_FILE', 'config/admin_password.txt')
-        
-        # Use absolute path or relative to project root
-        if not os.path.isabs(password_file):
-            # Try relative to src directory first, then project root
-            src_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '..', password_file)
-            root_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '..', '..', password_file)
-            if os.path.exists(src_path):
-                password_file = src_path
-            elif os.path.exists(root_path):
-                password_file = root_path
-        
-        if not os.path.exists(password_file):
-            logger.error(f"Admin password file not found: {password_file}")
+        # Read password from external file (cached until the file changes)
+        stored_password = _get_stored_password()
+        if stored_password is None:
+            logger.error(f"Admin password file not found: {_pw_cache['path']}")
             return jsonify({'error': 'Authentication configuration error'}), 500
         
-        with open(password_file, 'r') as f:
-            stored_password = f.read().strip()
+        # Use constant-time comparison to prevent timing attacks. Compare UTF-8 bytes
+        # (compare_digest rejects non-ASCII str); on a length mismatch do equivalent
+        # filler work and reject without comparing the candidate.
+        candidate = password.encode('utf-8')
+        expected = stored_password.encode('utf-8')
+        if len(candidate) != len(expected):
+            secrets.compare_digest(expected, expected)
+            password_matches = False
+        else:
+            password_matches = secrets.compare_digest(candidate, expected)
         
-        # Use constant-time comparison to prevent timing attacks
-        if secrets.compare_digest(password, stored_password):
+        if password_matches:
+            if limiter:
+                limiter.storage.clear(failure_key)
+            
             # Set session data - CRITICAL: Do this before creating any response
             session['admin_logged_in'] = True
             session.permanent = True  # Make session persistent
             session.modified = True  # Mark session as modified so Flask saves it
             
-            # Force Flask to save the session by accessing the session interface
-            # This ensures the session cookie is actually set
-            from flask import has_request_context
-            if has_request_context():
-                # Access session to trigger save
-                _ = session.get('admin_logged_in')
-            
             logger.info(f"Admin login successful from {client_ip}")
-            logger.debug(f"Session keys: {list(session.keys())}, Admin logged in: {session.get('admin_logged_in')}")
-            logger.debug(f"Session permanent: {session.permanent}, Session modified: {session.modified}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Session keys: {list(session.keys())}, Admin logged in: {session.get('admin_logged_in')}")
+                logger.debug(f"Session permanent: {session.permanent}, Session modified: {session.modified}")
             
             # Always return JSON for AJAX requests - session cookie is set in response
-            is_ajax = request.is_json or request.accept_mimetypes.best == 'application/json'
+            is_ajax = request.is_json or accepts_json()
             
-            dashboard_url = url_for('admin.admin_dashboard')
+            _resolve_admin_urls()
+            dashboard_url = _DASHBOARD_URL
             
             if is_ajax:
                 # AJAX request - return JSON with redirect URL
-                # Create response
-                response = make_response(jsonify({'success': True, 'redirect': dashboard_url}))
-                
-                # CRITICAL: Explicitly save session to ensure cookie is set
-                # Flask's session interface should save automatically, but we'll do it explicitly
-                from flask import current_app
-                try:
-                    session_interface = current_app.session_interface
-                    if session_interface:
-                        # Manually save the session to ensure cookie is set
-                        # This MUST happen before returning the response
-                        session_interface.save_session(current_app, session, response)
-                        logger.info("Session explicitly saved via session interface")
-                        
-                        # Verify cookie was actually set
-                        set_cookie_headers = [h for h in response.headers if h[0].lower() == 'set-cookie']
-                        session_cookie_set = False
-                        for header in set_cookie_headers:
-                            if 'session=' in header[1].lower():
-                                session_cookie_set = True
-                                logger.info(f"Session cookie confirmed in response: {header[1][:100]}...")
-                                break
-                        
-                        if not session_cookie_set:
-                            logger.error("CRITICAL: Session save called but no session cookie in response headers!")
-                            logger.error(f"All Set-Cookie headers: {[h[1][:50] for h in set_cookie_headers]}")
-                            logger.error(f"Session state - modified: {session.modified}, permanent: {session.permanent}")
-                            logger.error(f"Session keys: {list(session.keys())}")
-                    else:
-                        logger.error("No session interface found!")
-                except Exception as e:
-                    logger.error(f"Error saving session: {e}", exc_info=True)
-                
-                return response
+                # Flask's session interface sets the cookie when the response is finalized
+                return jsonify({'success': True, 'redirect': dashboard_url})
             else:
                 # Form submission - do server-side redirect
                 return redirect(dashboard_url)
         else:
-            # Add small delay to prevent timing attacks
-            time.sleep(0.1)
+            # Count the failure instead of sleeping - compare_digest already prevents timing attacks
+            if limiter:
+                limiter.storage.incr(failure_key, FAILED_LOGIN_WINDOW)
             logger.warning(f"Admin login failed from {client_ip}: Invalid password")
             return jsonify({'error': 'Invalid password'}), 401
     
@@ -164,7 +207,8 @@ def admin_logout():
     client_ip = request.remote_addr
     logger.info(f"Admin logout from {client_ip}")
     session.pop('admin_logged_in', None)
-    return jsonify({'success': True, 'redirect': url_for('admin.admin_login_page')})
+    _resolve_admin_urls()
+    return jsonify({'success': True, 'redirect': _LOGIN_URL})
 
 
 @bp.route('/dashboard')
@@ -172,7 +216,7 @@ def admin_logout():
 def admin_dashboard():
     """Admin dashboard"""
     logger.debug("Admin dashboard accessed")
-    return render_template('admin_dashboard.html')
+    return render_cached_template('admin_dashboard.html')
 
 
 @bp.route('/upload', methods=['POST'])
@@ -185,6 +229,11 @@ def upload_document():
     logger.info(f"File upload request from {client_ip}")
     
     try:
+        # Reject oversized uploads from the declared body size before parsing the form
+        if request.content_length and request.content_length > MAX_FILE_SIZE:
+            logger.warning(f"Upload too large from {client_ip}: {request.content_length / (1024*1024):.2f}MB declared")
+            return jsonify({'error': f'File too large. Maximum size: {MAX_FILE_SIZE / (1024*1024)}MB'}), 413
+        
         if 'file' not in request.files:
             logger.warning(f"No file provided in upload request from {client_ip}")
             return jsonify({'error': 'No file provided'}), 400
@@ -210,42 +259,100 @@ def upload_document():
             }), 400
         
         # Check file size
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
-        file.seek(0)
+        file.stream.seek(0, os.SEEK_END)
+        file_size = file.stream.tell()
+        file.stream.seek(0)
         
-        logger.debug(f"File size: {file_size / (1024*1024):.2f}MB")
+        logger.debug("File size: %.2fMB", file_size / (1024*1024))
         
         if file_size > MAX_FILE_SIZE:
             logger.warning(f"File too large from {client_ip}: {file_size / (1024*1024):.2f}MB")
             return jsonify({'error': f'File too large. Maximum size: {MAX_FILE_SIZE / (1024*1024)}MB'}), 400
         
-        # Secure filename and save temporarily
-        filename = secure_filename(file.filename)
+        filename = _unique_filename(file.filename)
         if not filename:
             logger.warning(f"Filename sanitization failed from {client_ip}: {file.filename}")
             return jsonify({'error': 'Invalid filename after sanitization'}), 400
         
-        # Add timestamp to prevent overwrites
-        timestamp = str(int(time.time()))
-        name, ext = os.path.splitext(filename)
-        filename = f"{name}_{timestamp}{ext}"
-        
-        temp_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(temp_path)
-        logger.debug(f"File saved temporarily: {temp_path}")
-        
-        # Upload to S3
+        # Stream the upload straight to S3 (no temporary copy on local disk)
         s3_key = f"documents/{filename}"
         logger.info(f"Uploading to S3: {s3_key}")
-        success = bedrock_kb.upload_to_s3(temp_path, s3_key)
-        
-        # Clean up temp file
-        os.remove(temp_path)
-        logger.debug(f"Temporary file removed: {temp_path}")
+        success = bedrock_kb.upload_stream_to_s3(file.stream, s3_key, content_type=file.mimetype)
         
         if success:
             logger.info(f"File uploaded successfully: {s3_key} (original: {original_filename})")
+            invalidate_sources_cache()
+            return jsonify({
+                'success': True,
+                'message': f'File {filename} uploaded successfully',
+                's3_key': s3_key
+            })
+        else:
+            logger.error(f"Failed to upload file to S3: {s3_key}")
+            return jsonify({'error': 'Failed to upload file to S3'}), 500
+    
+    except RequestEntityTooLarge:
+        # Let the app-level 413 handler answer
+        raise
+    except Exception as e:
+        logger.error(f"Upload error from {client_ip}: {str(e)}", exc_info=True)
+        return jsonify({'error': f'Upload failed: {str(e)}'}), 500
+
+
+@bp.route('/upload/<filename>', methods=['PUT'])
+@admin_required
+def upload_document_stream(filename):
+    """
+    Upload document to S3 bucket from the raw request body
+    
+    Intended for programmatic clients: the body is the file itself (no
+    multipart/form-data), so it is piped to S3 without running the form parser.
+    Example: curl -T report.pdf -H 'Content-Type: application/pdf' /admin/upload/report.pdf
+    """
+    client_ip = request.remote_addr
+    logger.info(f"Stream upload request from {client_ip}: {filename}")
+    
+    try:
+        # A declared length is required: Werkzeug gives chunked bodies without one an
+        # empty stream, which would silently store a 0-byte object. With it, the body
+        # is read through a stream limited to that length, so checking it against
+        # MAX_FILE_SIZE here bounds the upload.
+        if request.content_length is None:
+            logger.warning(f"Stream upload without Content-Length from {client_ip}")
+            return jsonify({'error': 'Content-Length header is required'}), 411
+        
+        if request.content_length == 0:
+            logger.warning(f"Empty stream upload from {client_ip}: {filename}")
+            return jsonify({'error': 'Empty file'}), 400
+        
+        if request.content_length > MAX_FILE_SIZE:
+            logger.warning(f"Upload too large from {client_ip}: {request.content_length / (1024*1024):.2f}MB declared")
+            return jsonify({'error': f'File too large. Maximum size: {MAX_FILE_SIZE / (1024*1024)}MB'}), 413
+        
+        # Validate filename
+        if not filename or len(filename) > 255:
+            logger.warning(f"Invalid filename from {client_ip}: {filename}")
+            return jsonify({'error': 'Invalid filename'}), 400
+        
+        if not allowed_file(filename):
+            logger.warning(f"File type not allowed from {client_ip}: {filename}")
+            return jsonify({
+                'error': f'File type not allowed. Allowed types: pdf, txt, doc, docx, md, html, csv'
+            }), 400
+        
+        original_filename = filename
+        filename = _unique_filename(filename)
+        if not filename:
+            logger.warning(f"Filename sanitization failed from {client_ip}: {original_filename}")
+            return jsonify({'error': 'Invalid filename after sanitization'}), 400
+        
+        s3_key = f"documents/{filename}"
+        logger.info(f"Streaming to S3: {s3_key}")
+        success = bedrock_kb.upload_stream_to_s3(request.stream, s3_key, content_type=request.mimetype or None)
+        
+        if success:
+            logger.info(f"File uploaded successfully: {s3_key} (original: {original_filename}, {request.content_length} bytes)")
+            invalidate_sources_cache()
             return jsonify({
                 'success': True,
                 'message': f'File {filename} uploaded successfully',
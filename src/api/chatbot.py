@@ -3,21 +3,22 @@ Chatbot API routes
 """
 import os
 import time
-from flask import Blueprint, render_template, request, jsonify, session
+from flask import Blueprint, request, jsonify, session
 
 try:
     from config import ConfigManager
     from config.logging_config import get_logger
-    from kb import BedrockKnowledgeBase
+    from kb import BedrockKnowledgeBase, BedrockThrottlingError, AdaptiveThrottle
     from db import Database
     from prompt import PromptEngine
 except ImportError:
     from ..config import ConfigManager
     from ..config.logging_config import get_logger
-    from ..kb import BedrockKnowledgeBase
+    from ..kb import BedrockKnowledgeBase, BedrockThrottlingError, AdaptiveThrottle
     from ..db import Database
     from ..prompt import PromptEngine
-from .utils import validate_question, sanitize_input
+from .utils import validate_question, sanitize_input, render_cached_template, ojsonify
+from .concurrency import ConcurrencyLimiter
 
 bp = Blueprint('chatbot', __name__)
 logger = get_logger(__name__)
@@ -26,30 +27,52 @@ logger = get_logger(__name__)
 config = None
 bedrock_kb = None
 db = None
+bedrock_throttle = None
+
+# Cap simultaneous in-flight questions per client IP
+ask_concurrency = ConcurrencyLimiter(max_concurrent=4)
+
+# Static config values read on every query, snapshotted at init
+_MODEL_ID = None
+_KB_ID = None
 
 
 def init_chatbot(config_manager: ConfigManager, bedrock: BedrockKnowledgeBase, database: Database):
     """Initialize chatbot routes with dependencies"""
-    global config, bedrock_kb, db
+    global config, bedrock_kb, db, bedrock_throttle
     config = config_manager
     bedrock_kb = bedrock
     db = database
+    # Per worker process: the configured limits apply to each gunicorn worker separately
+    bedrock_throttle = AdaptiveThrottle(
+        max_concurrency=config.get('BEDROCK_MAX_CONCURRENCY', 8),
+        requests_per_minute=config.get('BEDROCK_MAX_RPM', 0)
+    )
+    refresh_chatbot_cache()
     logger.info("Chatbot routes initialized")
 
 
+def refresh_chatbot_cache():
+    """Re-read the config values snapshotted for the query hot path"""
+    global _MODEL_ID, _KB_ID
+    _MODEL_ID = config.get('MODEL_ID')
+    _KB_ID = config.get('KNOWLEDGE_BASE_ID')
+
+
 @bp.route('/')
 def index():
     """Main chatbot interface"""
     logger.debug("Rendering chatbot interface")
-    return render_template('chatbot.html')
+    return render_cached_template('chatbot.html')
 
 
 @bp.route('/api/ask', methods=['POST'])
+@ask_concurrency.limit
 def ask_question():
     """
     Chatbot endpoint to query the Knowledge Base with history and metrics
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
     client_ip = request.remote_addr
     
     try:
@@ -58,9 +81,11 @@ def ask_question():
             logger.warning(f"Invalid request from {client_ip}: Missing JSON body")
             return jsonify({'error': 'Invalid request: JSON body required'}), 400
         
-        question = sanitize_input(data.get('question', ''))
-        session_id = sanitize_input(data.get('session_id', '')) or session.get('session_id')
-        query_type = sanitize_input(data.get('query_type', '')) if data.get('query_type') else None
+        question, session_id, query_type = (
+            sanitize_input(data.get(key, '')) for key in ('question', 'session_id', 'query_type')
+        )
+        session_id = session_id or session.get('session_id')
+        query_type = query_type or None
         use_advanced_prompts = data.get('use_advanced_prompts', True)
         
         logger.info(f"Query received from {client_ip} (session: {session_id[:8] if session_id else 'new'}): {question[:100]}")
@@ -74,22 +99,31 @@ def ask_question():
         # Get conversation history for context
         conversation_history = []
         if session_id:
-            history = db.get_session_history(session_id)
-            conversation_history = [
-                {'question': h['question'], 'answer': h['answer']} 
-                for h in history[-5:]  # Last 5 exchanges
-            ]
-            logger.debug(f"Loaded {len(conversation_history)} previous exchanges for session {session_id[:8]}")
+            conversation_history = db.get_session_history(session_id, limit=5)  # Last 5 exchanges
+            logger.debug("Loaded %d previous exchanges for session %.8s", len(conversation_history), session_id)
         
         # Query the Knowledge Base
-        logger.debug(f"Querying Knowledge Base (type: {query_type or 'auto-detect'}, advanced_prompts: {use_advanced_prompts})")
-        response = bedrock_kb.query(
-            question=question,
-            session_id=session_id,
-            conversation_history=conversation_history,
-            query_type=query_type,
-            use_advanced_prompts=use_advanced_prompts
-        )
+        logger.debug("Querying Knowledge Base (type: %s, advanced_prompts: %s)", query_type or 'auto-detect', use_advanced_prompts)
+        if not bedrock_throttle.acquire():
+            logger.warning(f"Bedrock throttle saturated, rejecting query from {client_ip}")
+            return jsonify({'error': 'Service is busy, please retry shortly'}), 429
+        try:
+            response = bedrock_kb.query(
+                question=question,
+                session_id=session_id,
+                conversation_history=conversation_history,
+                query_type=query_type,
+                use_advanced_prompts=use_advanced_prompts
+            )
+        except BedrockThrottlingError as e:
+            bedrock_throttle.on_throttle()
+            duration_ms = int((time.perf_counter() - start_time) * 1000)
+            db.save_error_metric(event_type='query', error_message=str(e), duration_ms=duration_ms, wait=False)
+            return jsonify({'error': 'Knowledge base is throttling requests, please retry shortly'}), 429
+        except Exception:
+            bedrock_throttle.release()
+            raise
+        bedrock_throttle.on_success()
         
         # Store session ID
         session['session_id'] = response.get('session_id')
@@ -100,25 +134,18 @@ def ask_question():
         
         logger.info(f"Query successful (session: {session_id[:8]}, response_time: {response_time}ms, sources: {sources_count})")
         
-        # Save to search history
-        query_id = db.save_query(
+        # Save to search history together with the query metric
+        duration_ms = int((time.perf_counter() - start_time) * 1000)
+        query_id = db.save_query_and_metric(
             session_id=session_id,
             question=question,
             answer=response.get('answer', ''),
             sources=response.get('sources', []),
-            model_id=config.get('MODEL_ID'),
-            kb_id=config.get('KNOWLEDGE_BASE_ID'),
-            response_time_ms=response_time
-        )
-        logger.debug(f"Query saved to history (query_id: {query_id})")
-        
-        # Save metric
-        duration_ms = int((time.time() - start_time) * 1000)
-        db.save_metric(
-            event_type='query',
+            model_id=_MODEL_ID,
+            kb_id=_KB_ID,
+            response_time_ms=response_time,
             event_data={
                 'question': question,
-                'query_id': query_id,
                 'session_id': session_id,
                 'sources_count': sources_count,
                 'query_type': response.get('query_type', 'general')
@@ -126,8 +153,9 @@ def ask_question():
             duration_ms=duration_ms,
             success=True
         )
+        logger.debug("Query saved to history (query_id: %s)", query_id)
         
-        return jsonify({
+        return ojsonify({
             'answer': response.get('answer', 'No answer found'),
             'sources': response.get('sources', []),
             'session_id': session_id,
@@ -141,15 +169,9 @@ def ask_question():
     except Exception as e:
         logger.error(f"Error querying knowledge base from {client_ip}: {str(e)}", exc_info=True)
         
-        # Save error metric
-        duration_ms = int((time.time() - start_time) * 1000)
-        db.save_metric(
-            event_type='query',
-            event_data={'error': str(e)},
-            duration_ms=duration_ms,
-            success=False,
-            error_message=str(e)
-        )
+        # Save error metric in the background - the error response doesn't depend on it
+        duration_ms = int((time.perf_counter() - start_time) * 1000)
+        db.save_error_metric(event_type='query', error_message=str(e), duration_ms=duration_ms, wait=False)
         
         return jsonify({'error': f'Failed to process question: {str(e)}'}), 500
 
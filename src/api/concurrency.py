@@ -0,0 +1,123 @@
+"""
+Concurrent in-flight request limiting for API routes
+"""
+import time
+import uuid
+import threading
+from functools import wraps
+from flask import jsonify
+from flask_limiter.util import get_remote_address
+from limits.storage import RedisStorage
+
+try:
+    from config.logging_config import get_logger
+except ImportError:
+    from ..config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Atomically drop stale slots, check the in-flight count and claim a slot
+# KEYS[1] = slot set, ARGV = now, slot ttl (seconds), limit, request token
+ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', tonumber(ARGV[1]) - tonumber(ARGV[2]))
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]) * 2)
+return 1
+"""
+
+
+class ConcurrencyLimiter:
+    """
+    Caps simultaneous in-flight requests per client
+
+    Uses a Redis sorted set per client when the rate limiter is Redis-backed
+    (shared across workers), otherwise an in-process counter. The in-process
+    counter only sees its own worker's requests, so with gunicorn sync workers
+    (one request each) the per-client cap never triggers; it only holds with
+    Redis storage (RATELIMIT_STORAGE_URL=redis://...).
+    """
+
+    def __init__(self, max_concurrent: int, slot_ttl: int = 150, key_prefix: str = 'inflight'):
+        """
+        Args:
+            max_concurrent: Maximum simultaneous requests per client
+            slot_ttl: Seconds after which an unreleased slot is considered stale; must exceed
+                the longest request (gunicorn --timeout is 120s; the Bedrock read timeout is 90s)
+            key_prefix: Prefix for per-client storage keys
+        """
+        self.max_concurrent = max_concurrent
+        self.slot_ttl = slot_ttl
+        self.key_prefix = key_prefix
+        self._redis = None
+        self._acquire_script = None
+        self._local = {}
+        self._lock = threading.Lock()
+
+    def init_storage(self, rate_limiter):
+        """Share the rate limiter's Redis connection if it has one"""
+        storage = rate_limiter.storage
+        if isinstance(storage, RedisStorage):
+            self._redis = storage.storage
+            self._acquire_script = self._redis.register_script(ACQUIRE_SCRIPT)
+            logger.info(f"Concurrency limiter using Redis storage (max {self.max_concurrent} per client)")
+        else:
+            logger.warning(
+                f"Concurrency limiter using in-process storage: the {self.max_concurrent} per client cap "
+                f"is per worker and not enforced across workers; set RATELIMIT_STORAGE_URL=redis://... to enforce it"
+            )
+
+    def acquire(self, client: str):
+        """Claim a slot for client; returns a release token, or None if the limit is reached"""
+        token = uuid.uuid4().hex
+        if self._redis is not None:
+            try:
+                acquired = self._acquire_script(
+                    keys=[f"{self.key_prefix}:{client}"],
+                    args=[time.time(), self.slot_ttl, self.max_concurrent, token]
+                )
+                return token if acquired else None
+            except Exception as e:
+                # Fail open - a storage outage shouldn't take the endpoint down
+                logger.warning(f"Concurrency limiter storage error, allowing request: {e}")
+                return token
+
+        with self._lock:
+            in_flight = self._local.get(client, 0)
+            if in_flight >= self.max_concurrent:
+                return None
+            self._local[client] = in_flight + 1
+        return token
+
+    def release(self, client: str, token: str):
+        """Release a slot claimed by acquire()"""
+        if self._redis is not None:
+            try:
+                self._redis.zrem(f"{self.key_prefix}:{client}", token)
+            except Exception as e:
+                logger.warning(f"Failed to release concurrency slot for {client}: {e}")
+            return
+
+        with self._lock:
+            in_flight = self._local.get(client, 0) - 1
+            if in_flight > 0:
+                self._local[client] = in_flight
+            else:
+                self._local.pop(client, None)
+
+    def limit(self, f):
+        """Decorator returning 429 while the client already has max_concurrent requests in flight"""
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            client = get_remote_address()
+            token = self.acquire(client)
+            if token is None:
+                logger.warning(f"Concurrent request limit reached for {client} on {f.__name__}")
+                return jsonify({'error': 'Too many concurrent requests. Please wait for pending requests to finish.'}), 429
+            try:
+                return f(*args, **kwargs)
+            finally:
+                self.release(client, token)
+        return decorated_function
@@ -1,7 +1,9 @@
 """
 Search history API routes
 """
-from flask import Blueprint, request, jsonify
+import time
+import threading
+from flask import Blueprint, Response, request, jsonify
 
 try:
     from config.logging_config import get_logger
@@ -11,6 +13,7 @@ except ImportError:
     from ..config.logging_config import get_logger
     from ..db import Database
     from ..kb import BedrockKnowledgeBase
+from .utils import json_dumps, stream_json_list
 
 bp = Blueprint('history', __name__, url_prefix='/api')
 logger = get_logger(__name__)
@@ -19,6 +22,11 @@ logger = get_logger(__name__)
 db = None
 bedrock_kb = None
 
+# Cached /api/sources response body (S3 listing is shared across polls for the TTL)
+SOURCES_CACHE_TTL = 30
+_sources_cache = {'body': None, 'expires': 0.0}
+_sources_lock = threading.Lock()
+
 
 def init_history(database: Database, bedrock: BedrockKnowledgeBase = None):
     """Initialize history routes with dependencies"""
@@ -43,14 +51,25 @@ def get_history():
             logger.warning(f"Limit too high ({limit}), capping at 1000")
             limit = 1000
         
-        logger.debug(f"Fetching history (session_id: {session_id[:8] if session_id else 'all'}, limit: {limit})")
-        history = db.get_search_history(session_id=session_id, limit=limit)
-        logger.info(f"Retrieved {len(history)} history records")
+        # Opaque "created_at,id" token from a previous response's next_cursor
+        cursor = None
+        cursor_param = request.args.get('cursor')
+        if cursor_param:
+            try:
+                created_at, last_id = cursor_param.rsplit(',', 1)
+                cursor = (created_at, int(last_id))
+            except ValueError:
+                logger.warning(f"Invalid history cursor: {cursor_param[:64]}")
+                return jsonify({'error': 'Invalid cursor parameter'}), 400
         
-        return jsonify({
-            'history': history,
-            'count': len(history)
-        })
+        logger.debug("Fetching history (session_id: %.8s, limit: %d)", session_id or 'all', limit)
+        history = db.iter_search_history(session_id=session_id, limit=limit, cursor=cursor)
+        
+        def next_cursor(last_row, count):
+            next_key = Database.next_history_cursor(last_row, count, limit)
+            return {'next_cursor': f"{next_key[0]},{next_key[1]}" if next_key else None}
+        
+        return stream_json_list('history', history, count_key='count', tail=next_cursor)
     except ValueError as e:
         logger.warning(f"Invalid limit parameter: {e}")
         return jsonify({'error': 'Invalid limit parameter'}), 400
@@ -93,26 +112,40 @@ def get_sources():
         if not bedrock_kb:
             return jsonify({'error': 'Bedrock Knowledge Base not initialized'}), 500
         
-        logger.debug("Fetching documents from knowledge base")
+        return Response(_get_sources_body(), mimetype='application/json')
+    except Exception as e:
+        logger.error(f"Error getting documents: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+def _get_sources_body() -> bytes:
+    """Encoded /api/sources payload, rebuilt from S3 at most once per SOURCES_CACHE_TTL"""
+    body = _sources_cache['body']
+    if body is not None and time.monotonic() < _sources_cache['expires']:
+        return body
+    
+    # Holding the lock while listing means concurrent polls share one S3 call
+    with _sources_lock:
+        if _sources_cache['body'] is not None and time.monotonic() < _sources_cache['expires']:
+            return _sources_cache['body']
         
-        # Get documents from knowledge base
+        logger.debug("Fetching documents from knowledge base")
         documents = bedrock_kb.list_documents()
         
         # Format response with only name and size
-        formatted_documents = []
-        for doc in documents:
-            formatted_documents.append({
-                'name': doc['name'],
-                'size': doc['size']
-            })
-        
+        formatted_documents = [{'name': doc['name'], 'size': doc['size']} for doc in documents]
         logger.info(f"Retrieved {len(formatted_documents)} documents from knowledge base")
         
-        return jsonify({
+        body = json_dumps({
             'documents': formatted_documents,
             'count': len(formatted_documents)
         })
-    except Exception as e:
-        logger.error(f"Error getting documents: {str(e)}", exc_info=True)
-        return jsonify({'error': str(e)}), 500
+        _sources_cache['body'] = body
+        _sources_cache['expires'] = time.monotonic() + SOURCES_CACHE_TTL
+        return body
+
 
+def invalidate_sources_cache():
+    """Drop the cached document list (call after the bucket contents change)"""
+    with _sources_lock:
+        _sources_cache['body'] = None
@@ -9,7 +9,7 @@ try:
 except ImportError:
     from ..config.logging_config import get_logger
     from ..db import Database
-from .utils import admin_required, sanitize_input
+from .utils import admin_required, sanitize_input, stream_json_list
 
 bp = Blueprint('metrics', __name__, url_prefix='/api')
 logger = get_logger(__name__)
@@ -40,7 +40,7 @@ def get_metrics():
         except (ValueError, TypeError):
             days = 7
         
-        logger.debug(f"Fetching metrics (days: {days}, event_type: {event_type})")
+        logger.debug("Fetching metrics (days: %d, event_type: %s)", days, event_type)
         summary = db.get_metrics_summary(days=days)
         
         if event_type:
@@ -50,17 +50,12 @@ def get_metrics():
                 logger.warning(f"Invalid event_type: {event_type}, ignoring filter")
                 event_type = None
         
-        if event_type:
-            metrics = db.get_metrics(event_type=event_type)
-            logger.debug(f"Retrieved {len(metrics)} metrics for event_type: {event_type}")
-        else:
-            metrics = db.get_metrics()
-            logger.debug(f"Retrieved {len(metrics)} total metrics")
+        # Only the last 100 metrics are returned, so limit in SQL
+        metrics = db.iter_metrics(event_type=event_type, limit=100)
         
         logger.info(f"Metrics retrieved successfully (period: {days} days, total: {summary.get('total_queries', 0)} queries)")
-        return jsonify({
+        return stream_json_list('recent_metrics', metrics, fields={
             'summary': summary,
-            'recent_metrics': metrics[:100],  # Last 100 metrics
             'period_days': days
         })
     except Exception as e:
@@ -2,70 +2,149 @@
 Utility functions for API routes
 """
 import re
+import json
+import logging
+import tempfile
+from datetime import date, datetime, timezone
 from functools import wraps
-from flask import jsonify, session, request, redirect, url_for
+from typing import Callable, Iterable, Optional
+from flask import Request, Response, jsonify, session, request, redirect, url_for, current_app, stream_with_context
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from config.logging_config import get_logger
+except ImportError:
+    from ..config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Upload file types accepted by allowed_file()
+ALLOWED_EXTENSIONS = frozenset(('pdf', 'txt', 'doc', 'docx', 'md', 'html', 'csv'))
+_ALLOWED_SUFFIXES = tuple(f'.{ext}' for ext in ALLOWED_EXTENSIONS)
+
+# Potentially malicious patterns flagged by validate_question, as one alternation
+# so the question is scanned once
+_SUSPICIOUS_RE = re.compile(r'<script|javascript:|on\w+\s*=', re.IGNORECASE)
+
+# admin_required: routes that get a JSON 401 vs. pages that redirect to the login page
+_API_PREFIXES = ('/admin/kb/', '/admin/upload', '/admin/config', '/api/')
+_PAGE_PATHS = frozenset(('/admin/dashboard', '/admin'))
+
+# Resolved Jinja templates, looked up once per name
+_template_cache = {}
+
+
+def render_cached_template(name: str) -> str:
+    """Render a context-free page template, resolving it through the blueprint loaders only once"""
+    template = _template_cache.get(name)
+    if template is None:
+        template = _template_cache[name] = current_app.jinja_env.get_template(name)
+    return template.render()
+
+
+def _json_default(obj):
+    """json.dumps default= for the fallback path, formatting dates the way orjson does"""
+    if isinstance(obj, datetime):
+        # OPT_NAIVE_UTC: naive datetimes are serialized as UTC
+        if obj.tzinfo is None:
+            obj = obj.replace(tzinfo=timezone.utc)
+        return obj.isoformat()
+    if isinstance(obj, date):
+        return obj.isoformat()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def json_dumps(obj) -> bytes:
+    """Serialize obj to compact UTF-8 JSON, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NAIVE_UTC)
+    return json.dumps(obj, separators=(',', ':'), default=_json_default).encode('utf-8')
+
+
+def ojsonify(obj, status: int = 200) -> Response:
+    """jsonify() replacement for high-volume endpoints (see json_dumps)"""
+    return Response(json_dumps(obj), status=status, mimetype='application/json')
+
+
+def stream_json_list(key: str, rows: Iterable, fields: Optional[dict] = None,
+                     count_key: Optional[str] = None,
+                     tail: Optional[Callable[[Optional[dict], int], dict]] = None) -> Response:
+    """
+    Stream {**fields, key: [rows...], count_key: len(rows), **tail(...)} as a JSON response
+    
+    Rows are serialized one at a time as the iterable yields them, so the full list
+    is never held in memory. The first row is fetched before the response starts so
+    query errors still surface to the caller as exceptions. tail, if given, is called
+    with the last row and the row count once the rows are exhausted.
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    head = json_dumps(fields)[:-1] + b',' if fields else b'{'
+    
+    def generate():
+        yield head + json_dumps(key) + b':['
+        count = 0
+        last = first
+        if first is not None:
+            yield json_dumps(first)
+            count = 1
+            for last in rows:
+                yield b',' + json_dumps(last)
+                count += 1
+        end = b']' + (b',' + json_dumps(count_key) + b':%d' % count if count_key else b'')
+        if tail:
+            tail_fields = tail(last, count)
+            if tail_fields:
+                end += b',' + json_dumps(tail_fields)[1:-1]
+        yield end + b'}'
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+def accepts_json() -> bool:
+    """True when the client asks for JSON rather than HTML (fetch/XHR), without parsing the Accept header"""
+    accept = request.headers.get('Accept', '')
+    return 'application/json' in accept and 'text/html' not in accept
 
 
 def admin_required(f):
     """Decorator to require admin authentication"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # Try to access session - this forces Flask to load it from the cookie
+        # Flask deserializes the session cookie on first access
         admin_logged_in = session.get('admin_logged_in', False)
         
-        # If session is empty but we should have a cookie, try to reload session
-        # This can happen if the session cookie wasn't read correctly
-        if not admin_logged_in:
-            # Check if we have a session cookie but session is empty
-            cookies = request.cookies
-            # Flask's default session cookie name is 'session'
-            if 'session' in cookies:
-                # We have a cookie but session is empty - might be a session loading issue
-                # Try to access session again to force reload
-                try:
-                    # Force session reload by accessing it
-                    _ = dict(session)
-                    admin_logged_in = session.get('admin_logged_in', False)
-                except Exception:
-                    pass
-        
-        # Debug logging
-        import logging
-        logger = logging.getLogger(__name__)
-        
         if not admin_logged_in:
+            path = request.path
+            is_api_prefix = path.startswith(_API_PREFIXES)
+            
             # Only log warning for API calls to avoid spam
-            is_api = request.path.startswith('/admin/kb/') or request.path.startswith('/admin/config') or request.path.startswith('/api/')
-            if is_api:
-                logger.warning(f"Admin check FAILED for API: {request.path}")
-        
-        if not admin_logged_in:
+            if is_api_prefix:
+                logger.warning(f"Admin check FAILED for API: {path}")
+            
             # Check if this is an API call (JSON request or fetch/XHR request)
             # API calls should return JSON, page requests should redirect
-            # Page routes that should redirect: /admin/dashboard
-            # API routes that should return JSON: /admin/kb/*, /admin/upload, /admin/config, /api/*
-            is_page_route = (
-                request.path == '/admin/dashboard' or
-                request.path == '/admin'
-            )
+            is_page_route = path in _PAGE_PATHS
             
             is_api_call = (
                 request.is_json or
-                (request.accept_mimetypes.best == 'application/json' and not is_page_route) or
-                request.path.startswith('/admin/kb/') or
-                request.path.startswith('/admin/upload') or
-                request.path.startswith('/admin/config') or
-                request.path.startswith('/api/')
+                (not is_page_route and accepts_json()) or
+                is_api_prefix
             )
             
-            logger.debug(f"Admin check failed - is_api_call: {is_api_call}, path: {request.path}, accept: {request.accept_mimetypes.best}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Admin check failed - is_api_call: {is_api_call}, path: {path}, accept: {request.headers.get('Accept', '')}")
             
             if is_api_call:
                 # Return JSON error for API calls
                 return jsonify({'error': 'Admin authentication required'}), 401
             else:
                 # Redirect to login for page requests
-                logger.debug(f"Redirecting to /admin from {request.path}")
+                logger.debug("Redirecting to /admin from %s", path)
                 return redirect('/admin')
         return f(*args, **kwargs)
     return decorated_function
@@ -92,15 +171,9 @@ def validate_question(question: str) -> tuple[bool, str]:
     
     # Check for potentially malicious patterns
     # Allow most characters but flag suspicious patterns
-    suspicious_patterns = [
-        r'<script',
-        r'javascript:',
-        r'on\w+\s*=',
-    ]
-    
-    for pattern in suspicious_patterns:
-        if re.search(pattern, question, re.IGNORECASE):
-            return False, "Question contains invalid content"
+    # Every pattern needs a '<', ':' or '=', so most questions skip the regex entirely
+    if ('=' in question or '<' in question or ':' in question) and _SUSPICIOUS_RE.search(question):
+        return False, "Question contains invalid content"
     
     return True, ""
 
@@ -110,6 +183,10 @@ def sanitize_input(text: str, max_length: int = 5000) -> str:
     if not text:
         return ""
     
+    # Fast path: typical input is short and has nothing to remove
+    if '\x00' not in text and len(text) <= max_length:
+        return text.strip()
+    
     # Remove null bytes
     text = text.replace('\x00', '')
     
@@ -122,11 +199,21 @@ def sanitize_input(text: str, max_length: int = 5000) -> str:
 
 def allowed_file(filename, allowed_extensions=None):
     """Check if file extension is allowed"""
+    if not filename:
+        return False
     if allowed_extensions is None:
-        allowed_extensions = {'pdf', 'txt', 'doc', 'docx', 'md', 'html', 'csv'}
+        return filename.lower().endswith(_ALLOWED_SUFFIXES)
     
-    if not filename or '.' not in filename:
+    dot = filename.rfind('.')
+    if dot < 0:
         return False
-    ext = filename.rsplit('.', 1)[1].lower()
-    return ext in allowed_extensions
+    return filename[dot + 1:].lower() in allowed_extensions
+
 
+class UploadRequest(Request):
+    """Request class that keeps uploaded files up to UPLOAD_SPOOL_SIZE in memory"""
+    
+    UPLOAD_SPOOL_SIZE = 8 * 1024 * 1024  # Werkzeug's default rolls over to disk at 500KB
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=self.UPLOAD_SPOOL_SIZE, mode='rb+')
@@ -12,7 +12,7 @@ src_dir = Path(__file__).parent
 if str(src_dir) not in sys.path:
     sys.path.insert(0, str(src_dir))
 
-from flask import Flask
+from flask import Flask, jsonify, session
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
@@ -22,6 +22,7 @@ from kb import BedrockKnowledgeBase
 from db import Database
 from prompt import PromptEngine
 from api import register_blueprints, init_api_routes
+from api.utils import UploadRequest
 
 # Set up logging
 logger = get_logger(__name__)
@@ -29,16 +30,28 @@ setup_logging()
 
 # Configure upload settings
 UPLOAD_FOLDER = '/tmp/uploads'
-ALLOWED_EXTENSIONS = {'pdf', 'txt', 'doc', 'docx', 'md', 'html', 'csv'}
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Auto-generated secret key used when FLASK_SECRET_KEY is unset
+_fallback_secret_key = None
+_upload_dir_ready = False
+
+
+def _ensure_upload_dir():
+    """Create UPLOAD_FOLDER once per process"""
+    global _upload_dir_ready
+    if _upload_dir_ready:
+        return
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    _upload_dir_ready = True
 
 
 def create_app():
     """Application factory pattern"""
     logger.info("Initializing Flask application")
     app = Flask(__name__)
+    # Small uploads stay in memory until they are streamed to S3
+    app.request_class = UploadRequest
     
     # CRITICAL: Configure Flask to work behind a reverse proxy (NGINX)
     # This ensures Flask correctly handles X-Forwarded-* headers
@@ -60,10 +73,14 @@ def create_app():
         logger.warning("ProxyFix not available - install werkzeug>=2.0.0")
     
     # Secure secret key generation - use environment variable or generate one
+    global _fallback_secret_key
     secret_key = os.getenv('FLASK_SECRET_KEY')
     if not secret_key:
-        # Generate a secure random key for development (warn in production)
-        secret_key = secrets.token_hex(32)
+        # Generate a secure random key for development (warn in production), once per
+        # process so repeated create_app() calls share it and keep sessions valid
+        if _fallback_secret_key is None:
+            _fallback_secret_key = secrets.token_hex(32)
+        secret_key = _fallback_secret_key
         if os.getenv('FLASK_ENV') == 'production':
             logger.warning("WARNING: Using auto-generated secret key in production! Set FLASK_SECRET_KEY environment variable.")
         else:
@@ -82,6 +99,7 @@ def create_app():
         logger.debug(f"Session cookie name: {app.session_interface.get_cookie_name(app)}")
     
     # Configure Flask settings
+    _ensure_upload_dir()
     app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
     app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
     logger.debug(f"Upload folder: {UPLOAD_FOLDER}, Max file size: {MAX_FILE_SIZE / (1024*1024)}MB")
@@ -98,13 +116,30 @@ def create_app():
     logger.debug(f"Session configured (name: {app.config['SESSION_COOKIE_NAME']}, secure: {app.config['SESSION_COOKIE_SECURE']}, samesite: {app.config['SESSION_COOKIE_SAMESITE']}, domain: {app.config['SESSION_COOKIE_DOMAIN']})")
     
     # Initialize rate limiter
+    # Set RATELIMIT_STORAGE_URL=redis://host:6379 to share limits across Gunicorn workers
+    storage_uri = os.getenv('RATELIMIT_STORAGE_URL', 'memory://')
+    storage_options = {}
+    if storage_uri.startswith(('redis://', 'rediss://')):
+        import redis
+        # Pooled connections with short timeouts so a slow Redis can't stall requests
+        # (timeout bounds the wait for a free connection when all 50 are in use)
+        storage_options['connection_pool'] = redis.BlockingConnectionPool.from_url(
+            storage_uri,
+            max_connections=50,
+            timeout=0.2,
+            socket_connect_timeout=0.1,
+            socket_timeout=0.2
+        )
     limiter = Limiter(
         app=app,
         key_func=get_remote_address,
         default_limits=["200 per day", "50 per hour"],
-        storage_uri="memory://"
+        application_limits=["1000 per hour"],  # Aggregate cap per client across all routes
+        strategy='moving-window',
+        storage_uri=storage_uri,
+        storage_options=storage_options
     )
-    logger.info("Rate limiter initialized")
+    logger.info(f"Rate limiter initialized (storage: {storage_uri.split('://', 1)[0]}, strategy: moving-window)")
     
     # Initialize configuration and services
     logger.info("Initializing configuration and services")
@@ -133,50 +168,20 @@ def create_app():
     logger.info("Registering blueprints")
     register_blueprints(app, limiter)
     
-    # Ensure sessions are saved after each request
+    # Werkzeug aborts bodies over MAX_CONTENT_LENGTH - answer with JSON like the API routes do
+    @app.errorhandler(413)
+    def request_entity_too_large(e):
+        logger.warning(f"Request body exceeds MAX_CONTENT_LENGTH ({MAX_FILE_SIZE / (1024*1024)}MB)")
+        return jsonify({'error': f'File too large. Maximum size: {MAX_FILE_SIZE / (1024*1024)}MB'}), 413
+    
+    # Keep modified sessions persistent. Flask's session interface writes the
+    # cookie itself once after_request handlers have run, so no manual save here.
     @app.after_request
     def save_session(response):
-        """Ensure session is saved after each request"""
-        from flask import session
-        # Force session to be saved if it was modified
-        if session.modified:
-            session.permanent = True
-            
-            # CRITICAL: Flask's session interface saves the cookie when response is finalized
-            # Check if Set-Cookie header is present
-            set_cookie_headers = [h for h in response.headers if h[0].lower() == 'set-cookie']
-            session_cookie_found = False
-            for header in set_cookie_headers:
-                if 'session=' in header[1].lower():
-                    session_cookie_found = True
-                    logger.debug(f"Session cookie being set: {header[1][:150]}...")
-                    break
-            
-            if not session_cookie_found:
-                # Session was modified but cookie not set - try to save it
-                logger.warning("Session modified but no session cookie found - attempting to save")
-                try:
-                    session_interface = app.session_interface
-                    if session_interface:
-                        # Manually save the session
-                        session_interface.save_session(app, session, response)
-                        logger.info("Manually triggered session save in after_request")
-                        
-                        # Check again
-                        set_cookie_headers_after = [h for h in response.headers if h[0].lower() == 'set-cookie']
-                        for header in set_cookie_headers_after:
-                            if 'session=' in header[1].lower():
-                                logger.info("Session cookie now present after manual save")
-                                break
-                        else:
-                            logger.error("CRITICAL: Session save called but still no cookie in response!")
-                            logger.error(f"Session state - modified: {session.modified}, permanent: {session.permanent}")
-                            logger.error(f"Session keys: {list(session.keys())}")
-                            logger.error(f"Session interface type: {type(session_interface).__name__}")
-                    else:
-                        logger.error("No session interface available!")
-                except Exception as e:
-                    logger.error(f"Failed to manually save session: {e}", exc_info=True)
+        """Mark modified sessions permanent before Flask saves them"""
+        if not session.modified:
+            return response
+        session.permanent = True
         return response
     
     logger.info("Application initialization complete")
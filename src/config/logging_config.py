@@ -3,11 +3,26 @@ Logging configuration for the application
 """
 import os
 import sys
+import copy
 import logging
 import logging.config
 import logging.handlers
 from pathlib import Path
 
+# dictConfig dicts built from logging.ini, keyed by (path, mtime, level, file logging, app name)
+_LOGGING_DICT_CACHE = {}
+_log_dir_ready = False
+
+
+def _ensure_log_dir() -> Path:
+    """Create the logs directory once per process"""
+    global _log_dir_ready
+    log_dir = Path('logs')
+    if not _log_dir_ready:
+        log_dir.mkdir(exist_ok=True)
+        _log_dir_ready = True
+    return log_dir
+
 
 def setup_logging(app_name: str = 'bedrock-chatbot', log_level: str = None, use_file_logging: bool = None, config_file: str = None):
     """
@@ -50,47 +65,15 @@ def setup_logging(app_name: str = 'bedrock-chatbot', log_level: str = None, use_
     # Try to load from config file if it exists
     if config_file.exists():
         try:
-            # Read and modify config file based on environment variables
-            import configparser
-            config = configparser.ConfigParser()
-            config.read(config_file)
-            
-            # Override log level from environment
-            if 'logger_root' in config:
-                config['logger_root']['level'] = log_level
-            
-            # Modify handlers based on file logging preference
-            handlers_list = []
-            if log_to_file:
-                handlers_list = ['consoleHandler', 'fileHandler', 'errorFileHandler']
-                # Create logs directory if it doesn't exist
-                log_dir = Path('logs')
-                log_dir.mkdir(exist_ok=True)
-                
-                # Update file paths with app_name
-                if 'handler_fileHandler' in config:
-                    config['handler_fileHandler']['args'] = f"('logs/{app_name}.log', 'a', 10485760, 5)"
-                if 'handler_errorFileHandler' in config:
-                    config['handler_errorFileHandler']['args'] = f"('logs/{app_name}-errors.log', 'a', 10485760, 5)"
-            else:
-                handlers_list = ['consoleHandler']
-                # Use detailed formatter for console when file logging is disabled
-                if 'handler_consoleHandler' in config:
-                    config['handler_consoleHandler']['formatter'] = 'detailedFormatter'
-            
-            # Ensure console handler uses stdout
-            if 'handler_consoleHandler' in config:
-                # StreamHandler defaults to stderr, but we want stdout
-                # This is handled in the handler class itself
-                pass
-            
-            config['logger_root']['handlers'] = ','.join(handlers_list)
-            
-            # Convert config to dict for dictConfig
-            logging_config_dict = _configparser_to_dict(config)
+            key = (str(config_file), config_file.stat().st_mtime_ns, log_level, log_to_file, app_name)
+            logging_config_dict = _LOGGING_DICT_CACHE.get(key)
+            if logging_config_dict is None:
+                logging_config_dict = _LOGGING_DICT_CACHE[key] = _load_config_file(config_file, app_name, log_level, log_to_file)
+            elif log_to_file:
+                _ensure_log_dir()
             
-            # Apply configuration
-            logging.config.dictConfig(logging_config_dict)
+            # Apply configuration (dictConfig consumes the dicts it is given, so pass a copy)
+            logging.config.dictConfig(copy.deepcopy(logging_config_dict))
             
             root_logger = logging.getLogger()
             root_logger.info(f"Logging configured from file: {config_file}")
@@ -116,6 +99,47 @@ def setup_logging(app_name: str = 'bedrock-chatbot', log_level: str = None, use_
     return _setup_logging_programmatic(app_name, level, log_to_file)
 
 
+def _load_config_file(config_file: Path, app_name: str, log_level: str, log_to_file: bool) -> dict:
+    """Read logging.ini, apply environment overrides and convert it for dictConfig"""
+    # Read and modify config file based on environment variables
+    import configparser
+    config = configparser.ConfigParser()
+    config.read(config_file)
+    
+    # Override log level from environment
+    if 'logger_root' in config:
+        config['logger_root']['level'] = log_level
+    
+    # Modify handlers based on file logging preference
+    handlers_list = []
+    if log_to_file:
+        handlers_list = ['consoleHandler', 'fileHandler', 'errorFileHandler']
+        # Create logs directory if it doesn't exist
+        _ensure_log_dir()
+    
+        # Update file paths with app_name
+        if 'handler_fileHandler' in config:
+            config['handler_fileHandler']['args'] = f"('logs/{app_name}.log', 'a', 10485760, 5)"
+        if 'handler_errorFileHandler' in config:
+            config['handler_errorFileHandler']['args'] = f"('logs/{app_name}-errors.log', 'a', 10485760, 5)"
+    else:
+        handlers_list = ['consoleHandler']
+        # Use detailed formatter for console when file logging is disabled
+        if 'handler_consoleHandler' in config:
+            config['handler_consoleHandler']['formatter'] = 'detailedFormatter'
+    
+    # Ensure console handler uses stdout
+    if 'handler_consoleHandler' in config:
+        # StreamHandler defaults to stderr, but we want stdout
+        # This is handled in the handler class itself
+        pass
+    
+    config['logger_root']['handlers'] = ','.join(handlers_list)
+    
+    # Convert config to dict for dictConfig
+    return _configparser_to_dict(config)
+
+
 def _configparser_to_dict(config):
     """Convert ConfigParser object to dict for logging.config.dictConfig"""
     config_dict = {
@@ -227,8 +251,7 @@ def _setup_logging_programmatic(app_name: str, level: int, log_to_file: bool):
     # File handlers - only if file logging is enabled
     if log_to_file:
         # Create logs directory if it doesn't exist
-        log_dir = Path('logs')
-        log_dir.mkdir(exist_ok=True)
+        log_dir = _ensure_log_dir()
         
         # File handler (all logs)
         file_handler = logging.handlers.RotatingFileHandler(
@@ -15,6 +15,37 @@ load_dotenv()
 
 logger = get_logger(__name__)
 
+# AWS region names, e.g. us-east-1 (\Z so a trailing newline doesn't match)
+_AWS_REGION_RE = re.compile(r'^[a-z0-9-]+\Z')
+
+
+# Numeric settings and their types; coerced on load and in set() so validate() only checks bounds
+_NUMERIC_KEYS = {
+    'MAX_TOKENS': int,
+    'TEMPERATURE': float,
+    'BEDROCK_MAX_CONCURRENCY': int,
+    'BEDROCK_MAX_RPM': int,
+}
+
+
+def _parse_number(name, value, cast):
+    """Coerce a numeric setting, failing with a clear error if it doesn't parse"""
+    try:
+        if isinstance(value, bool):
+            raise ValueError
+        return cast(value)
+    except (TypeError, ValueError):
+        logger.error("Invalid %s: %r is not a valid %s", name, value, cast.__name__)
+        raise ValueError(f"{name} must be a valid {cast.__name__}, got: {value!r}") from None
+
+
+def _getenv_number(name, default):
+    """Read a numeric environment variable (see _NUMERIC_KEYS for its type)"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return _parse_number(name, value, _NUMERIC_KEYS[name])
+
 
 class ConfigManager:
     """Manages application configuration from environment variables"""
@@ -41,20 +72,33 @@ class ConfigManager:
             #
             'MODEL_ID': os.getenv('MODEL_ID', 'openai.gpt-oss-120b-1:0'),
             'S3_BUCKET_NAME': os.getenv('S3_BUCKET_NAME', 'abt-bedrock-kb-store'),
-            'MAX_TOKENS': int(os.getenv('MAX_TOKENS', 1000)),
-            'TEMPERATURE': float(os.getenv('TEMPERATURE', 0.7)),
+            'MAX_TOKENS': _getenv_number('MAX_TOKENS', 1000),
+            'TEMPERATURE': _getenv_number('TEMPERATURE', 0.7),
+            # Client-side Bedrock throttle: max concurrent calls and requests per minute (0 = no RPM cap)
+            'BEDROCK_MAX_CONCURRENCY': _getenv_number('BEDROCK_MAX_CONCURRENCY', 8),
+            'BEDROCK_MAX_RPM': _getenv_number('BEDROCK_MAX_RPM', 0),
             'ADMIN_PASSWORD_FILE': os.getenv('ADMIN_PASSWORD_FILE', 'config/admin_password.txt'),
             'FLASK_SECRET_KEY': os.getenv('FLASK_SECRET_KEY', 'dev-secret-key-change-in-production'),
             'FLASK_DEBUG': os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
         }
+        # Get configuration value - bound straight to dict.get (no wrapper frame);
+        # set() updates self.config in place so this stays in sync
+        self.get = self.config.get
         logger.info(f"Configuration loaded (region: {self.config['AWS_REGION']}, KB ID: {self.config['KNOWLEDGE_BASE_ID']})")
     
-    def get(self, key, default=None):
-        """Get configuration value"""
-        return self.config.get(key, default)
+    def __getitem__(self, key):
+        """Get a required configuration value"""
+        return self.config[key]
+    
+    def __contains__(self, key):
+        """Check whether a configuration key is set"""
+        return key in self.config
     
     def set(self, key, value):
-        """Set configuration value"""
+        """Set configuration value (numeric settings are coerced, raising ValueError if invalid)"""
+        cast = _NUMERIC_KEYS.get(key)
+        if cast is not None:
+            value = _parse_number(key, value, cast)
         self.config[key] = value
     
     def validate(self):
@@ -69,21 +113,31 @@ class ConfigManager:
         
         # Validate AWS region format
         region = self.config.get('AWS_REGION', '')
-        if region and not re.match(r'^[a-z0-9-]+$', region):
+        if region and not _AWS_REGION_RE.match(region):
             logger.error(f"Invalid AWS region format: {region}")
             raise ValueError(f"Invalid AWS region format: {region}")
         
-        # Validate numeric values
+        # Validate numeric bounds (types are already coerced on load and in set())
         max_tokens = self.config.get('MAX_TOKENS', 1000)
-        if not isinstance(max_tokens, int) or max_tokens < 1 or max_tokens > 100000:
-            logger.error(f"Invalid MAX_TOKENS: {max_tokens}")
+        if not (1 <= max_tokens <= 100000):
+            logger.error("Invalid MAX_TOKENS: %s", max_tokens)
             raise ValueError(f"MAX_TOKENS must be between 1 and 100000, got: {max_tokens}")
         
         temperature = self.config.get('TEMPERATURE', 0.7)
-        if not isinstance(temperature, (int, float)) or temperature < 0 or temperature > 2:
-            logger.error(f"Invalid TEMPERATURE: {temperature}")
+        if not (0.0 <= temperature <= 2.0):
+            logger.error("Invalid TEMPERATURE: %s", temperature)
             raise ValueError(f"TEMPERATURE must be between 0 and 2, got: {temperature}")
         
+        max_concurrency = self.config.get('BEDROCK_MAX_CONCURRENCY', 8)
+        if max_concurrency < 1:
+            logger.error("Invalid BEDROCK_MAX_CONCURRENCY: %s", max_concurrency)
+            raise ValueError(f"BEDROCK_MAX_CONCURRENCY must be at least 1, got: {max_concurrency}")
+        
+        max_rpm = self.config.get('BEDROCK_MAX_RPM', 0)
+        if max_rpm < 0:
+            logger.error("Invalid BEDROCK_MAX_RPM: %s", max_rpm)
+            raise ValueError(f"BEDROCK_MAX_RPM must be 0 (no limit) or more, got: {max_rpm}")
+        
         logger.info("Configuration validation passed")
         return True
 
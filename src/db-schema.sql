@@ -4,7 +4,7 @@ CREATE TABLE IF NOT EXISTS search_history (
     session_id TEXT,
     question TEXT NOT NULL,
     answer TEXT NOT NULL,
-    sources TEXT,  -- JSON array of sources
+    sources TEXT,  -- JSON array of sources: JSON text, or zlib-compressed JSON BLOB when >= 1 KiB (see database._dumps)
     model_id TEXT,
     kb_id TEXT,
     response_time_ms INTEGER,
@@ -15,7 +15,7 @@ CREATE TABLE IF NOT EXISTS search_history (
 CREATE TABLE IF NOT EXISTS metrics (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     event_type TEXT NOT NULL,  -- 'query', 'upload', 'sync', etc.
-    event_data TEXT,  -- JSON data
+    event_data TEXT,  -- JSON text, or zlib-compressed JSON BLOB when >= 1 KiB (see database._dumps)
     duration_ms INTEGER,
     success BOOLEAN,
     error_message TEXT,
@@ -31,8 +31,15 @@ CREATE TABLE IF NOT EXISTS sessions (
 );
 
 -- Create indexes
+-- Composite (filter, created_at) indexes serve both the equality filter and the
+-- ORDER BY / date range. idx_session_id stays for the id-ordered conversation context
+-- lookup, and idx_event_type is covered by idx_metrics_event_created.
+-- idx_history_session_time is ascending so a backward scan yields (created_at, id)
+-- descending, which the keyset-paginated history query orders by.
+DROP INDEX IF EXISTS idx_event_type;
 CREATE INDEX IF NOT EXISTS idx_session_id ON search_history(session_id);
+CREATE INDEX IF NOT EXISTS idx_history_session_time ON search_history(session_id, created_at);
 CREATE INDEX IF NOT EXISTS idx_created_at ON search_history(created_at);
-CREATE INDEX IF NOT EXISTS idx_event_type ON metrics(event_type);
+CREATE INDEX IF NOT EXISTS idx_metrics_event_created ON metrics(event_type, created_at);
 CREATE INDEX IF NOT EXISTS idx_metrics_created_at ON metrics(created_at);
 
@@ -3,11 +3,22 @@ Database models and utilities for search history and metrics
 """
 import sqlite3
 import json
-from datetime import datetime
-from typing import List, Dict, Optional
+import zlib
+import time
+import queue
+import atexit
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple, Union
 from contextlib import contextmanager
 import os
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 try:
     from config.logging_config import get_logger
 except ImportError:
@@ -15,18 +26,165 @@ except ImportError:
 
 logger = get_logger(__name__)
 
+# Per-connection settings (journal_mode=WAL is set once in _init_database).
+# synchronous=NORMAL is safe with WAL: a power loss can drop the last commits
+# but never corrupts the database.
+CONNECTION_PRAGMAS = (
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-65536',      # 64MB page cache
+    'PRAGMA mmap_size=268435456',    # 256MB memory-mapped reads
+)
+
+# Seconds a get_metrics_summary result is reused when nothing was written meanwhile
+SUMMARY_CACHE_TTL = 30
+
+# Writes applied per writer-thread transaction, and the writer queue bound
+WRITE_BATCH_SIZE = 100
+WRITE_QUEUE_SIZE = 10_000
+# Seconds a waiting writer blocks for queue space or its commit before giving up
+WRITE_TIMEOUT = 30
+
+# sources/event_data JSON at least this long is stored zlib-compressed as a BLOB
+COMPRESS_MIN_BYTES = 1024
+COMPRESSED_COLUMNS = ('sources', 'event_data')
+
+# Rows fetched per fetchmany() call when streaming results
+FETCH_BATCH_SIZE = 256
+
+# Columns returned by history/metrics reads (projected explicitly rather than SELECT *)
+HISTORY_COLUMNS = ('id', 'session_id', 'question', 'answer', 'sources', 'model_id',
+                   'kb_id', 'response_time_ms', 'created_at')
+METRIC_COLUMNS = ('id', 'event_type', 'event_data', 'duration_ms', 'success',
+                  'error_message', 'created_at')
+
+INSERT_QUERY_SQL = '''
+    INSERT INTO search_history 
+    (session_id, question, answer, sources, model_id, kb_id, response_time_ms)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Bumps the per-session query counter in place (INSERT OR REPLACE would delete and
+# reinsert the row, also resetting created_at)
+UPSERT_SESSION_SQL = '''
+    INSERT INTO sessions (session_id, last_activity, query_count)
+    VALUES (?, CURRENT_TIMESTAMP, 1)
+    ON CONFLICT(session_id) DO UPDATE SET
+        last_activity = CURRENT_TIMESTAMP,
+        query_count = query_count + 1
+'''
+
+# Most recent exchanges for a session (read on every question for conversation context)
+SESSION_HISTORY_SQL = '''
+    SELECT question, answer FROM search_history
+    WHERE session_id = ?
+    ORDER BY id DESC
+    LIMIT ?
+'''
+
+# Dashboard summary in one statement: the search_history date range is read once
+# into `recent` and drives the totals, per-day counts and top 10 questions; the
+# 'total' row also carries the query success counts from metrics. :since is a
+# precomputed UTC timestamp, so created_at comparisons are plain index range seeks.
+METRICS_SUMMARY_SQL = '''
+    WITH recent AS MATERIALIZED (
+        SELECT question, response_time_ms, DATE(created_at) AS day
+        FROM search_history
+        WHERE created_at >= :since
+    )
+    SELECT 'total' AS kind, NULL AS label, COUNT(*) AS count,
+           AVG(response_time_ms) AS avg_response_time,
+           MIN(response_time_ms) AS min_response_time,
+           MAX(response_time_ms) AS max_response_time,
+           (SELECT COUNT(*) FROM metrics
+            WHERE event_type = 'query' AND created_at >= :since) AS metric_total,
+           (SELECT COUNT(*) FROM metrics
+            WHERE event_type = 'query' AND success = 1
+            AND created_at >= :since) AS successful
+    FROM recent
+    UNION ALL
+    SELECT 'day', day, COUNT(*), NULL, NULL, NULL, NULL, NULL
+    FROM recent
+    GROUP BY day
+    UNION ALL
+    SELECT * FROM (
+        SELECT 'top', question, COUNT(*) AS count, NULL, NULL, NULL, NULL, NULL
+        FROM recent
+        GROUP BY question
+        ORDER BY count DESC
+        LIMIT 10
+    )
+'''
+
+INSERT_METRIC_SQL = '''
+    INSERT INTO metrics (event_type, event_data, duration_ms, success, error_message)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+
+def _sql_timestamp(dt: datetime) -> str:
+    """Format a datetime like SQLite's CURRENT_TIMESTAMP (UTC, 'YYYY-MM-DD HH:MM:SS')"""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _dumps(obj) -> Union[str, bytes]:
+    """
+    Serialize sources/event_data for storage (orjson when installed)
+    
+    Large payloads (retrieved source chunks) are zlib-compressed and stored as a
+    BLOB, small ones stay JSON text. Rows read back through _iter_rows are
+    always JSON text again.
+    """
+    data = orjson.dumps(obj) if orjson is not None else json.dumps(obj).encode('utf-8')
+    if len(data) >= COMPRESS_MIN_BYTES:
+        return zlib.compress(data, 1)
+    return data.decode('utf-8')
+
+
+def _inflate_row(row: tuple, indexes: List[int]) -> tuple:
+    """Copy of row with the compressed JSON values at indexes decoded to text"""
+    row = list(row)
+    for i in indexes:
+        if isinstance(row[i], bytes):
+            row[i] = zlib.decompress(row[i]).decode('utf-8')
+    return tuple(row)
+
+
+def _select_list(columns: Optional[List[str]], allowed: Tuple[str, ...]) -> str:
+    """Validated SELECT column list (column names can't be bound as parameters)"""
+    if not columns:
+        return ', '.join(allowed)
+    unknown = [c for c in columns if c not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    return ', '.join(columns)
+
 
 class Database:
     """SQLite database for storing search history and metrics"""
     
-    def __init__(self, db_path: str = 'data/chatbot.db'):
+    def __init__(self, db_path: str = 'data/chatbot.db', pool_size: int = 5):
         """
         Initialize database connection
         
         Args:
             db_path: Path to SQLite database file
+            pool_size: Number of idle connections kept open for reuse
         """
         self.db_path = db_path
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        # SQLite allows one writer at a time; serialize writers in-process instead of
+        # letting them spin on the database lock
+        self._write_lock = threading.Lock()
+        # get_metrics_summary results by days -> (computed at, summary); cleared on writes.
+        # Each clear bumps the generation so a summary read before a write is never stored after it
+        self._summary_cache = {}
+        self._summary_generation = 0
+        self._summary_lock = threading.Lock()
+        # (kind, payload, Future) write jobs applied in batches by the writer thread
+        self._write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
         logger.info(f"Initializing database: {db_path}")
         
         # Create directory if needed (handle case where db_path is just filename)
@@ -36,6 +194,10 @@ class Database:
             logger.debug(f"Database directory created/verified: {db_dir}")
         
         self._init_database()
+        
+        self._writer_thread = threading.Thread(target=self._writer_loop, name='db-writer', daemon=True)
+        self._writer_thread.start()
+        atexit.register(self._stop_writer)
         logger.info("Database initialization complete")
     
     def _init_database(self):
@@ -52,29 +214,187 @@ class Database:
             schema_sql = f.read()
         
         with self._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Execute all SQL commands from the schema file
-            # Split by semicolon and execute each statement
-            statements = [stmt.strip() for stmt in schema_sql.split(';') if stmt.strip()]
-            logger.debug(f"Executing {len(statements)} SQL statements from schema")
-            
-            for statement in statements:
-                if statement:
-                    cursor.execute(statement)
-            
-            conn.commit()
-            logger.debug("Database schema initialized successfully")
+            # WAL is persistent on the database file, so it only needs setting once:
+            # readers no longer block behind writers and commits append to the log
+            journal_mode = conn.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+            logger.debug(f"Database journal mode: {journal_mode}")
+        
+        # Run the whole schema as one script in a single transaction. BEGIN/COMMIT are
+        # part of the script because executescript() commits any transaction already
+        # open; on failure _get_connection() rolls the open transaction back.
+        # ANALYZE refreshes planner statistics so new indexes are picked up, and the
+        # analysis limit keeps it cheap on large databases.
+        with self._write_lock, self._get_connection() as conn:
+            conn.executescript(
+                'BEGIN IMMEDIATE;\n'
+                f'{schema_sql}\n;\n'
+                'PRAGMA analysis_limit=1000;\n'
+                'ANALYZE;\n'
+                'COMMIT;'
+            )
+        
+        logger.debug("Database schema initialized successfully")
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a configured connection (shared across threads via the pool)"""
+        # Autocommit mode: writes manage their own transactions in _transaction()
+        # cached_statements keeps every statement this class issues prepared on the
+        # connection, so repeat calls skip SQLite's parser and planner
+        # Rows come back as plain tuples; _iter_rows maps them to dicts using the
+        # column names read once per query from cursor.description
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                               cached_statements=256)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
     
     @contextmanager
     def _get_connection(self):
-        """Get database connection with context manager"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        """Borrow a pooled connection, opening a new one if none is idle"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
         try:
             yield conn
         finally:
-            conn.close()
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+    
+    @contextmanager
+    def _transaction(self):
+        """Borrow a connection for writing and run the block in one BEGIN IMMEDIATE transaction"""
+        with self._write_lock, self._get_connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+            with self._summary_lock:
+                self._summary_generation += 1
+                self._summary_cache.clear()
+    
+    def _submit_write(self, kind: str, payload, wait: bool = True):
+        """
+        Hand a write to the writer thread
+        
+        With wait, blocks until it is committed and returns its result (query ID or
+        row count), raising TimeoutError after WRITE_TIMEOUT seconds so a stuck
+        writer can't hang request threads (the write may still be applied later).
+        Otherwise returns None immediately, dropping the write (and logging) rather
+        than blocking when the queue is full.
+        """
+        job = (kind, payload, Future())
+        if not self._writer_thread.is_alive():
+            # Writer already stopped (interpreter shutdown) - write inline
+            self._apply_writes([job])
+        elif wait:
+            try:
+                self._write_queue.put(job, timeout=WRITE_TIMEOUT)
+            except queue.Full:
+                raise TimeoutError(f"Write queue still full after {WRITE_TIMEOUT}s, {kind} write not queued") from None
+        else:
+            try:
+                self._write_queue.put_nowait(job)
+            except queue.Full:
+                logger.warning(f"Write queue full, dropping {kind} write")
+            return None
+        return job[2].result(timeout=WRITE_TIMEOUT) if wait else None
+    
+    def _writer_loop(self):
+        """Apply queued writes until the shutdown sentinel is received"""
+        while True:
+            job = self._write_queue.get()
+            if job is None:
+                break
+            # Group whatever queued up during the previous commit into one transaction
+            batch = [job]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    job = self._write_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    self._apply_writes(batch)
+                    return
+                batch.append(job)
+            self._apply_writes(batch)
+    
+    def _apply_writes(self, batch: List[Tuple]):
+        """Commit a batch of write jobs and resolve their futures"""
+        try:
+            results = self._write_batch(batch)
+        except Exception as e:
+            if len(batch) > 1:
+                # Don't let one bad row sink the rest of the batch
+                logger.warning(f"Batched write of {len(batch)} jobs failed, retrying individually: {e}")
+                for job in batch:
+                    self._apply_writes([job])
+                return
+            logger.error(f"Database write failed: {e}", exc_info=True)
+            batch[0][2].set_exception(e)
+            return
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+    
+    def _write_batch(self, batch: List[Tuple]) -> List:
+        """Run a batch of write jobs in one transaction, returning each job's result"""
+        results = []
+        metric_rows = []
+        with self._transaction() as conn:
+            cursor = conn.cursor()
+            for kind, payload, _ in batch:
+                if kind == 'query':
+                    query_args, metric = payload
+                    query_id = self._insert_query(cursor, *query_args)
+                    if metric:
+                        event_data, duration_ms, success = metric
+                        metric_rows.append(('query', {**event_data, 'query_id': query_id},
+                                            duration_ms, success, None))
+                    results.append(query_id)
+                elif kind == 'queries':
+                    cursor.executemany(INSERT_QUERY_SQL, (
+                        (session_id, question, answer, _dumps(sources), model_id, kb_id, response_time_ms)
+                        for session_id, question, answer, sources, model_id, kb_id, response_time_ms in payload
+                    ))
+                    cursor.executemany(UPSERT_SESSION_SQL, ((row[0],) for row in payload))
+                    results.append(len(payload))
+                else:
+                    metric_rows.extend(payload)
+                    results.append(len(payload))
+            if metric_rows:
+                self._insert_metrics(cursor, metric_rows)
+        return results
+    
+    def _stop_writer(self):
+        """Flush queued writes and stop the writer thread"""
+        if self._writer_thread.is_alive():
+            self._write_queue.put(None)
+            self._writer_thread.join(timeout=5)
+        # Apply anything queued behind the sentinel
+        while True:
+            try:
+                job = self._write_queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                self._apply_writes([job])
+    
+    def close(self):
+        """Flush pending writes and close all idle pooled connections"""
+        atexit.unregister(self._stop_writer)
+        self._stop_writer()
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
     
     def save_query(self, session_id: str, question: str, answer: str, 
                    sources: List[Dict], model_id: str, kb_id: str, 
@@ -85,115 +405,207 @@ class Database:
         Returns:
             Query ID
         """
-        logger.debug(f"Saving query to history (session: {session_id[:8] if session_id else 'N/A'}, response_time: {response_time_ms}ms)")
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO search_history 
-                (session_id, question, answer, sources, model_id, kb_id, response_time_ms)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                session_id,
-                question,
-                answer,
-                json.dumps(sources),
-                model_id,
-                kb_id,
-                response_time_ms
-            ))
-            query_id = cursor.lastrowid
-            
-            # Update session
-            cursor.execute('''
-                INSERT OR REPLACE INTO sessions (session_id, last_activity, query_count)
-                VALUES (
-                    ?,
-                    CURRENT_TIMESTAMP,
-                    COALESCE((SELECT query_count FROM sessions WHERE session_id = ?), 0) + 1
-                )
-            ''', (session_id, session_id))
-            
-            conn.commit()
-            logger.debug(f"Query saved with ID: {query_id}")
-            return query_id
+        logger.debug("Saving query to history (session: %.8s, response_time: %sms)", session_id or 'N/A', response_time_ms)
+        query_id = self._submit_write('query', (
+            (session_id, question, answer, sources, model_id, kb_id, response_time_ms), None
+        ))
+        logger.debug("Query saved with ID: %s", query_id)
+        return query_id
+    
+    def save_query_and_metric(self, session_id: str, question: str, answer: str,
+                              sources: List[Dict], model_id: str, kb_id: str,
+                              response_time_ms: int, event_data: Dict,
+                              duration_ms: Optional[int] = None,
+                              success: bool = True) -> int:
+        """
+        Save a query to search history and its 'query' metric in one transaction
+        
+        The new query ID is added to event_data as 'query_id' before the metric is stored.
+        
+        Returns:
+            Query ID
+        """
+        logger.debug("Saving query and metric (session: %.8s, response_time: %sms)", session_id or 'N/A', response_time_ms)
+        query_id = self._submit_write('query', (
+            (session_id, question, answer, sources, model_id, kb_id, response_time_ms),
+            (event_data, duration_ms, success)
+        ))
+        logger.debug("Query and metric saved with ID: %s", query_id)
+        return query_id
+    
+    def save_queries(self, rows: Iterable[Tuple]) -> int:
+        """
+        Save many queries to search history in one transaction
+        
+        Args:
+            rows: (session_id, question, answer, sources, model_id, kb_id, response_time_ms) tuples
+        
+        Returns:
+            Number of rows saved
+        """
+        count = self._submit_write('queries', list(rows))
+        logger.debug("Saved %d queries", count)
+        return count
+    
+    def _insert_query(self, cursor, session_id: str, question: str, answer: str,
+                      sources: List[Dict], model_id: str, kb_id: str,
+                      response_time_ms: int) -> int:
+        """Insert a search history row and bump the session counter (caller commits)"""
+        cursor.execute(INSERT_QUERY_SQL, (
+            session_id,
+            question,
+            answer,
+            _dumps(sources),
+            model_id,
+            kb_id,
+            response_time_ms
+        ))
+        query_id = cursor.lastrowid
+        
+        # Update session
+        cursor.execute(UPSERT_SESSION_SQL, (session_id,))
+        return query_id
     
     def get_search_history(self, session_id: Optional[str] = None, 
-                          limit: int = 50, query_id: Optional[int] = None) -> List[Dict]:
+                          limit: int = 50, query_id: Optional[int] = None,
+                          columns: Optional[List[str]] = None,
+                          cursor: Optional[Tuple[str, int]] = None) -> List[Dict]:
         """
-        Get search history
+        Get search history, newest first
         
         Args:
             session_id: Optional session ID to filter by
             limit: Maximum number of results
             query_id: Optional specific query ID to retrieve
+            columns: Optional subset of HISTORY_COLUMNS to fetch (default: all)
+            cursor: Optional (created_at, id) of the last row already seen; only
+                older rows are returned (see next_history_cursor)
         
         Returns:
             List of query records
         """
+        return list(self.iter_search_history(session_id=session_id, limit=limit,
+                                             query_id=query_id, columns=columns,
+                                             cursor=cursor))
+    
+    def iter_search_history(self, session_id: Optional[str] = None,
+                            limit: int = 50, query_id: Optional[int] = None,
+                            columns: Optional[List[str]] = None,
+                            cursor: Optional[Tuple[str, int]] = None) -> Iterator[Dict]:
+        """Same as get_search_history, but yields rows as they are fetched"""
         if query_id:
-            logger.debug(f"Fetching query by ID: {query_id}")
+            logger.debug("Fetching query by ID: %s", query_id)
         elif session_id:
-            logger.debug(f"Fetching history for session: {session_id[:8]} (limit: {limit})")
+            logger.debug("Fetching history for session: %.8s (limit: %s)", session_id, limit)
         else:
-            logger.debug(f"Fetching all history (limit: {limit})")
+            logger.debug("Fetching all history (limit: %s)", limit)
+        
+        query = f"SELECT {_select_list(columns, HISTORY_COLUMNS)} FROM search_history"
+        if query_id:
+            query += ' WHERE id = ?'
+            params = [query_id]
+        else:
+            # Keyset pagination: seek past the cursor via the index instead of OFFSET
+            clauses, params = [], []
+            if session_id:
+                clauses.append('session_id = ?')
+                params.append(session_id)
+            if cursor:
+                clauses.append('(created_at, id) < (?, ?)')
+                params.extend(cursor)
+            if clauses:
+                query += ' WHERE ' + ' AND '.join(clauses)
+            query += ' ORDER BY created_at DESC, id DESC LIMIT ?'
+            params.append(limit)
         
         with self._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            if query_id:
-                cursor.execute('''
-                    SELECT * FROM search_history
-                    WHERE id = ?
-                ''', (query_id,))
-            elif session_id:
-                cursor.execute('''
-                    SELECT * FROM search_history
-                    WHERE session_id = ?
-                    ORDER BY created_at DESC
-                    LIMIT ?
-                ''', (session_id, limit))
-            else:
-                cursor.execute('''
-                    SELECT * FROM search_history
-                    ORDER BY created_at DESC
-                    LIMIT ?
-                ''', (limit,))
-            
-            rows = cursor.fetchall()
-            return [self._row_to_dict(row) for row in rows]
+            yield from self._iter_rows(conn.execute(query, params))
     
-    def get_session_history(self, session_id: str) -> List[Dict]:
-        """Get all queries for a specific session"""
-        return self.get_search_history(session_id=session_id, limit=1000)
+    @staticmethod
+    def next_history_cursor(last_row: Optional[Dict], count: int, limit: int) -> Optional[Tuple[str, int]]:
+        """Cursor for the page after one ending in last_row, or None if that was the last page"""
+        if last_row is None or count < limit:
+            return None
+        return (last_row['created_at'], last_row['id'])
+    
+    def get_session_history(self, session_id: str, limit: int = 5) -> List[Dict]:
+        """
+        Get the most recent question/answer pairs for a session
+        
+        Args:
+            session_id: Session ID to fetch
+            limit: Maximum number of exchanges to return
+        
+        Returns:
+            List of {'question', 'answer'} dicts, oldest first
+        """
+        with self._get_connection() as conn:
+            rows = conn.execute(SESSION_HISTORY_SQL, (session_id, limit)).fetchall()
+        return [{'question': question, 'answer': answer} for question, answer in reversed(rows)]
     
     def save_metric(self, event_type: str, event_data: Dict, 
                    duration_ms: Optional[int] = None, success: bool = True,
-                   error_message: Optional[str] = None):
-        """Save a metric event"""
-        logger.debug(f"Saving metric: {event_type} (success: {success}, duration: {duration_ms}ms)")
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO metrics (event_type, event_data, duration_ms, success, error_message)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
-                event_type,
-                json.dumps(event_data),
-                duration_ms,
-                success,
-                error_message
-            ))
-            conn.commit()
-            logger.debug(f"Metric saved: {event_type}")
+                   error_message: Optional[str] = None, wait: bool = True):
+        """Save a metric event (wait=False queues it without waiting for the commit)"""
+        logger.debug("Saving metric: %s (success: %s, duration: %sms)", event_type, success, duration_ms)
+        self.save_metrics([(event_type, event_data, duration_ms, success, error_message)], wait=wait)
+    
+    def save_metrics(self, rows: Iterable[Tuple], wait: bool = True) -> Optional[int]:
+        """
+        Save many metric events in one transaction
+        
+        Args:
+            rows: (event_type, event_data, duration_ms, success, error_message) tuples
+            wait: Block until committed; if False, queue the write and return None
+        
+        Returns:
+            Number of rows saved
+        """
+        count = self._submit_write('metrics', list(rows), wait=wait)
+        if wait:
+            logger.debug("Saved %s metrics", count)
+        return count
+    
+    def save_error_metric(self, event_type: str, error_message: str,
+                          duration_ms: Optional[int] = None, wait: bool = True):
+        """Save a failed metric event with the error as its event data"""
+        self.save_metric(
+            event_type=event_type,
+            event_data={'error': error_message},
+            duration_ms=duration_ms,
+            success=False,
+            error_message=error_message,
+            wait=wait
+        )
+    
+    def _insert_metrics(self, cursor, rows: Iterable[Tuple]):
+        """Insert metrics rows, serializing event_data as they are consumed (caller commits)"""
+        cursor.executemany(INSERT_METRIC_SQL, (
+            (event_type, _dumps(event_data), duration_ms, success, error_message)
+            for event_type, event_data, duration_ms, success, error_message in rows
+        ))
     
     def get_metrics(self, event_type: Optional[str] = None,
                    start_date: Optional[datetime] = None,
-                   end_date: Optional[datetime] = None) -> List[Dict]:
-        """Get metrics data"""
+                   end_date: Optional[datetime] = None,
+                   limit: int = 1000, records: bool = False) -> List[Dict]:
+        """
+        Get metrics data, newest first (at most `limit` rows)
+        
+        With records=True rows are returned as plain tuples in METRIC_COLUMNS order,
+        skipping the per-row dict build for analytical callers.
+        """
+        return list(self.iter_metrics(event_type, start_date, end_date, limit, records))
+    
+    def iter_metrics(self, event_type: Optional[str] = None,
+                     start_date: Optional[datetime] = None,
+                     end_date: Optional[datetime] = None,
+                     limit: int = 1000, records: bool = False) -> Iterator[Dict]:
+        """Same as get_metrics, but yields rows as they are fetched"""
         with self._get_connection() as conn:
             cursor = conn.cursor()
             
-            query = 'SELECT * FROM metrics WHERE 1=1'
+            query = f"SELECT {', '.join(METRIC_COLUMNS)} FROM metrics WHERE 1=1"
             params = []
             
             if event_type:
@@ -202,81 +614,77 @@ class Database:
             
             if start_date:
                 query += ' AND created_at >= ?'
-                params.append(start_date.isoformat())
+                params.append(_sql_timestamp(start_date))
             
             if end_date:
                 query += ' AND created_at <= ?'
-                params.append(end_date.isoformat())
+                params.append(_sql_timestamp(end_date))
             
-            query += ' ORDER BY created_at DESC LIMIT 1000'
+            query += ' ORDER BY created_at DESC LIMIT ?'
+            params.append(limit)
             
             cursor.execute(query, params)
-            rows = cursor.fetchall()
-            return [self._row_to_dict(row) for row in rows]
+            yield from self._iter_rows(cursor, records)
     
     def get_metrics_summary(self, days: int = 7) -> Dict:
-        """Get metrics summary for the last N days"""
-        logger.debug(f"Calculating metrics summary for last {days} days")
+        """Get metrics summary for the last N days (cached for SUMMARY_CACHE_TTL seconds)"""
+        cached = self._summary_cache.get(days)
+        if cached and time.monotonic() - cached[0] < SUMMARY_CACHE_TTL:
+            return cached[1]
+        
+        logger.debug("Calculating metrics summary for last %s days", days)
+        computed_at = time.monotonic()
+        generation = self._summary_generation
         with self._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Total queries
-            cursor.execute('''
-                SELECT COUNT(*) as count, 
-                       AVG(response_time_ms) as avg_response_time,
-                       MIN(response_time_ms) as min_response_time,
-                       MAX(response_time_ms) as max_response_time
-                FROM search_history
-                WHERE created_at >= datetime('now', '-' || ? || ' days')
-            ''', (days,))
-            query_stats = cursor.fetchone()
-            
-            # Success rate
-            cursor.execute('''
-                SELECT 
-                    COUNT(*) as total,
-                    SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END) as successful
-                FROM metrics
-                WHERE event_type = 'query' 
-                AND created_at >= datetime('now', '-' || ? || ' days')
-            ''', (days,))
-            success_stats = cursor.fetchone()
-            
-            # Queries per day
-            cursor.execute('''
-                SELECT DATE(created_at) as date, COUNT(*) as count
-                FROM search_history
-                WHERE created_at >= datetime('now', '-' || ? || ' days')
-                GROUP BY DATE(created_at)
-                ORDER BY date DESC
-            ''', (days,))
-            daily_queries = cursor.fetchall()
-            
-            # Top questions
-            cursor.execute('''
-                SELECT question, COUNT(*) as count
-                FROM search_history
-                WHERE created_at >= datetime('now', '-' || ? || ' days')
-                GROUP BY question
-                ORDER BY count DESC
-                LIMIT 10
-            ''', (days,))
-            top_questions = cursor.fetchall()
-            
-            return {
-                'total_queries': query_stats['count'] if query_stats else 0,
-                'avg_response_time_ms': query_stats['avg_response_time'] if query_stats else 0,
-                'min_response_time_ms': query_stats['min_response_time'] if query_stats else 0,
-                'max_response_time_ms': query_stats['max_response_time'] if query_stats else 0,
-                'success_rate': (success_stats['successful'] / success_stats['total'] * 100) 
-                               if success_stats and success_stats['total'] > 0 else 0,
-                'daily_queries': [{'date': row['date'], 'count': row['count']} 
-                                 for row in daily_queries],
-                'top_questions': [{'question': row['question'], 'count': row['count']} 
-                                for row in top_questions]
-            }
+            since = _sql_timestamp(datetime.now(timezone.utc) - timedelta(days=days))
+            cursor = conn.execute(METRICS_SUMMARY_SQL, {'since': since})
+            columns = [d[0] for d in cursor.description]
+            rows = cursor.fetchall()
+        
+        query_stats = None
+        daily_queries = []
+        top_questions = []
+        for row in rows:
+            kind, label, count = row[:3]
+            if kind == 'total':
+                query_stats = dict(zip(columns, row))
+            elif kind == 'day':
+                daily_queries.append({'date': label, 'count': count})
+            else:
+                top_questions.append({'question': label, 'count': count})
+        # UNION ALL doesn't guarantee order across branches
+        daily_queries.sort(key=lambda d: d['date'], reverse=True)
+        top_questions.sort(key=lambda q: q['count'], reverse=True)
+        
+        summary = {
+            'total_queries': query_stats['count'] if query_stats else 0,
+            'avg_response_time_ms': query_stats['avg_response_time'] if query_stats else 0,
+            'min_response_time_ms': query_stats['min_response_time'] if query_stats else 0,
+            'max_response_time_ms': query_stats['max_response_time'] if query_stats else 0,
+            'success_rate': (query_stats['successful'] / query_stats['metric_total'] * 100)
+                           if query_stats and query_stats['metric_total'] else 0,
+            'daily_queries': daily_queries,
+            'top_questions': top_questions
+        }
+        with self._summary_lock:
+            if self._summary_generation == generation:
+                self._summary_cache[days] = (computed_at, summary)
+        return summary
     
-    def _row_to_dict(self, row) -> Dict:
-        """Convert SQLite row to dictionary"""
-        return dict(row)
+    def _iter_rows(self, cursor, records: bool = False) -> Iterator:
+        """
+        Yield result rows as dicts (or tuples with records), FETCH_BATCH_SIZE at a time
+        
+        Compressed JSON columns are inflated back to text.
+        """
+        columns = tuple(d[0] for d in cursor.description)
+        compressed = [i for i, column in enumerate(columns) if column in COMPRESSED_COLUMNS]
+        cursor.arraysize = FETCH_BATCH_SIZE
+        while rows := cursor.fetchmany():
+            for row in rows:
+                for i in compressed:
+                    if isinstance(row[i], bytes):
+                        row = _inflate_row(row, compressed)
+                        break
+                yield row if records else dict(zip(columns, row))
 
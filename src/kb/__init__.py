@@ -1,7 +1,8 @@
 """
 KB (Knowledge Base) package for AWS Bedrock Knowledge Base interactions
 """
-from .bedrock import BedrockKnowledgeBase
+from .bedrock import BedrockKnowledgeBase, BedrockThrottlingError
+from .throttle import AdaptiveThrottle
 
-__all__ = ['BedrockKnowledgeBase']
+__all__ = ['BedrockKnowledgeBase', 'BedrockThrottlingError', 'AdaptiveThrottle']
 
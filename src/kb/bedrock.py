@@ -5,12 +5,26 @@ See https://docs.aws.amazon.com/bedrock/latest/userguide/getting-started-api-ex-
     https://docs.aws.amazon.com/bedrock/latest/userguide/service_code_examples_bedrock-runtime_anthropic_claude.html
     https://github.com/awsdocs/aws-doc-sdk-examples/tree/main/python/example_code/bedrock-runtime
 """
+import re
 import boto3
+import copy
 import json
 import uuid
 import time
-from botocore.exceptions import ClientError
-from typing import Dict, List, Optional
+import logging
+import threading
+from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionClosedError, ConnectionError as BotoConnectionError
+from typing import BinaryIO, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 try:
     from config.logging_config import get_logger
@@ -19,10 +33,112 @@ except ImportError:
 
 logger = get_logger(__name__)
 
+# Session IDs Bedrock accepts (pattern: [0-9a-zA-Z._:-]+)
+_SESSION_ID_RE = re.compile(r'\A[0-9a-zA-Z._:-]+\Z')
+
+# Error codes Bedrock uses to signal request-rate throttling
+THROTTLING_ERROR_CODES = ('ThrottlingException', 'TooManyRequestsException', 'ServiceQuotaExceededException')
+
+# retrieve_and_generate attempts for transient failures (5xx, connection errors); throttling
+# and read timeouts are never retried
+TRANSIENT_MAX_ATTEMPTS = 3
+TRANSIENT_BACKOFF_BASE = 0.5
+
+
+class BedrockThrottlingError(Exception):
+    """Raised when Bedrock rejects a call because of request-rate throttling"""
+
+
+class _LazyJSON:
+    """Log argument that only pretty-prints its object if the record is actually emitted"""
+    __slots__ = ('obj',)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __str__(self):
+        if orjson is not None:
+            return orjson.dumps(self.obj, default=str, option=orjson.OPT_INDENT_2).decode('utf-8')
+        return json.dumps(self.obj, default=str, indent=2)
+
+
+# Managed transfer settings for streamed uploads (multipart above 8MB). Stream parts
+# are buffered in memory, so they are the 5MB S3 minimum: with 10 in flight a
+# maximum-size (50MB) upload goes out as one wave of parallel parts, buffering ~50MB
+UPLOAD_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=5 * 1024 * 1024,
+    max_concurrency=10,
+    use_threads=True
+)
+
+
+# Once documents/ holds more than one listing page, it is listed as parallel key
+# ranges split at these keys (ranges are (previous bound, bound], so no key is missed)
+LIST_SHARD_BOUNDARIES = tuple(f'documents/{c}' for c in '159DHLPTXbfjnrvz')
+LIST_SHARD_WORKERS = 16
+
+# Knowledge base prompt templates sent with every retrieve_and_generate call
+ORCHESTRATION_PROMPT_TEMPLATE = """Review the following retrieved documents and prepare a comprehensive context to help answer the user's question. Organize the information logically and include all relevant details.
+
+Retrieved Documents:
+$search_results$
+
+User Question:
+$query$
+
+Conversation History:
+$conversation_history$
+
+Output Format Instructions:
+$output_format_instructions$
+
+Organized Context:"""
+
+GENERATION_PROMPT_TEMPLATE = """Use the following pieces of context to answer the question at the end. If you don't know the answer, just say that you don't know, don't try to make up an answer.
+
+Context:
+$search_results$
+
+Question: $query$
+
+Answer:"""
+
+# Seconds a passing health_check() result is reused, so polling monitors don't call AWS
+# each time; failures are never cached so recovery is reported on the next poll
+HEALTH_CHECK_CACHE_TTL = 30
+
+# Shared client settings: reuse kept-alive connections from a pool large enough for
+# concurrent queries, and bound the long retrieve_and_generate calls. The read timeout
+# stays well under gunicorn's 120s --timeout, leaving room for the throttle wait (up to
+# 10s) and the DB write, so a slow call fails with a JSON error instead of a killed worker
+BOTO_CLIENT_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=64,
+    connect_timeout=5,
+    read_timeout=90,
+    retries={'max_attempts': 3, 'mode': 'standard'}
+)
+
+# Per-service overrides merged over BOTO_CLIENT_CONFIG. retrieve_and_generate is not
+# retried by botocore: its throttling must reach AdaptiveThrottle.on_throttle at once
+# rather than being retried (and delayed) inside the call. Transient failures are
+# retried by _retrieve_and_generate instead
+CLIENT_CONFIG_OVERRIDES = {
+    'bedrock-agent-runtime': Config(retries={'total_max_attempts': 1, 'mode': 'standard'}),
+}
+
 
 class BedrockKnowledgeBase:
     """Handles interactions with AWS Bedrock Knowledge Base"""
 
+    # boto3 Session and clients shared by all instances (one credential resolver and
+    # one connection pool per service/region), guarded because Session.client()
+    # isn't thread-safe
+    _session = None
+    _clients = {}
+    _clients_lock = threading.Lock()
+
     def __init__(self, config, prompt_engine=None):
         """
         Initialize Bedrock client and configuration
@@ -42,30 +158,155 @@ class BedrockKnowledgeBase:
         # TODO os.environ['AWS_BEARER_TOKEN_BEDROCK'] = "${api-key}"
 
         self.prompt_engine = prompt_engine
+        # Monotonic time of the last passing health_check(), or None
+        self._health_check_cache = None
+
+        # Static part of the retrieve_and_generate request, built once instead of per query
+        self._retrieve_config_template = self._build_retrieve_config_template()
+        self._primary_model_arn, self._alt_model_arns = self._resolve_model_arns()
+
+        # KB/model settings never change after startup, so check them once here; query()
+        # raises this instead of re-validating on every call
+        self._config_error = self._validate_query_config()
+        if self._config_error:
+            logger.warning(f"Knowledge Base queries disabled: {self._config_error}")
 
         logger.info(f"Initializing Bedrock Knowledge Base client (region: {self.region}, KB ID: {self.kb_id})")
 
-        # Initialize AWS clients
+        # AWS clients are created on first use (see the properties below)
         try:
             # Check for AWS credentials
-            session = boto3.Session()
-            credentials = session.get_credentials()
+            credentials = self._get_session().get_credentials()
             if credentials is None:
                 logger.warning("No AWS credentials found. Please configure AWS credentials using one of:")
                 logger.warning("  1. AWS credentials file: ~/.aws/credentials")
                 logger.warning("  2. Environment variables: AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY")
                 logger.warning("  3. IAM role (if running on EC2/ECS/Lambda)")
                 logger.warning("  4. AWS SSO: aws sso login")
-
-            self.bedrock_agent = boto3.client('bedrock-agent-runtime', region_name=self.region)
-            self.bedrock = boto3.client('bedrock', region_name=self.region)
-            self.s3 = boto3.client('s3', region_name=self.region)
-            self.bedrock_agent_client = boto3.client('bedrock-agent', region_name=self.region)
-            logger.info("AWS Bedrock clients initialized successfully")
+            logger.info("AWS session initialized successfully")
         except Exception as e:
-            logger.error(f"Failed to initialize AWS clients: {str(e)}", exc_info=True)
+            logger.error(f"Failed to initialize AWS session: {str(e)}", exc_info=True)
             raise
 
+    @cached_property
+    def bedrock_agent(self):
+        """bedrock-agent-runtime client (retrieve_and_generate)"""
+        return self._get_client('bedrock-agent-runtime', self.region)
+
+    @cached_property
+    def bedrock(self):
+        """bedrock control-plane client"""
+        return self._get_client('bedrock', self.region)
+
+    @cached_property
+    def s3(self):
+        """S3 client for the documents bucket"""
+        return self._get_client('s3', self.region)
+
+    @cached_property
+    def bedrock_agent_client(self):
+        """bedrock-agent client (KB status, data sources, ingestion jobs)"""
+        return self._get_client('bedrock-agent', self.region)
+
+    @classmethod
+    def _get_session(cls) -> boto3.Session:
+        """The boto3 Session shared by all instances"""
+        with cls._clients_lock:
+            if cls._session is None:
+                cls._session = boto3.Session()
+            return cls._session
+
+    @classmethod
+    def _get_client(cls, service_name: str, region: Optional[str]):
+        """Shared client for service_name in region, created on first use"""
+        session = cls._get_session()
+        with cls._clients_lock:
+            client = cls._clients.get((service_name, region))
+            if client is None:
+                config = BOTO_CLIENT_CONFIG
+                if service_name in CLIENT_CONFIG_OVERRIDES:
+                    config = config.merge(CLIENT_CONFIG_OVERRIDES[service_name])
+                client = session.client(service_name, region_name=region, config=config)
+                cls._clients[(service_name, region)] = client
+            return client
+
+    def _validate_query_config(self) -> Optional[str]:
+        """Reason queries can't run with the configured KB/model, or None if they can"""
+        if not self.kb_id or not isinstance(self.kb_id, str) or not self.kb_id.strip():
+            return "Knowledge Base ID not configured"
+        if not self.model_id or not isinstance(self.model_id, str) or not self.model_id.strip():
+            return "Model ID is not configured or invalid"
+        return None
+
+    def _resolve_model_arns(self):
+        """
+        Model ARN sent with each query, plus the alternatives retried on a model validation error
+
+        Returns:
+            (primary ARN, list of alternative ARNs in order of likelihood)
+        """
+        if not self.model_id or not isinstance(self.model_id, str):
+            return None, []
+
+        if self.model_id.startswith('arn:aws:bedrock:'):
+            if ':inference-profile/' in self.model_id:
+                logger.warning(f"Inference profile ARN provided, but foundation model ARN is required. Will attempt conversion in retry logic.")
+            else:
+                logger.debug(f"Using provided foundation model ARN: {self.model_id}")
+            primary_arn = self.model_id.strip()
+        else:
+            # Construct foundation model ARN using the full model ID (including version suffix)
+            # According to foundation-models.txt, the modelArn format is:
+            # arn:aws:bedrock:<region>::foundation-model/<full-model-id>
+            primary_arn = f"arn:aws:bedrock:{self.region}::foundation-model/{self.model_id}".strip()
+            logger.debug(f"Constructed foundation model ARN: {primary_arn}")
+
+        alt_arns = []
+
+        # Try 1: Foundation model ARN format with full model ID (as per foundation-models.txt)
+        alt_arns.append(f"arn:aws:bedrock:{self.region}::foundation-model/{self.model_id}")
+
+        # Try 2: Alternative Claude 3.5 Sonnet versions (if current model doesn't work)
+        if 'claude-3-5-sonnet' in self.model_id.lower():
+            # Try the older version that supports ON_DEMAND
+            alt_model = 'anthropic.claude-3-5-sonnet-20240620-v1:0'
+            if alt_model != self.model_id:
+                alt_arns.append(f"arn:aws:bedrock:{self.region}::foundation-model/{alt_model}")
+
+        # Try 3: Base model ID without version suffix (fallback)
+        if ':' in self.model_id:
+            base_model_id = self.model_id.split(':')[0]
+            alt_arns.append(f"arn:aws:bedrock:{self.region}::foundation-model/{base_model_id}")
+
+        # Drop duplicates and the primary ARN itself, keeping the order
+        alt_arns = [arn for arn in dict.fromkeys(alt_arns) if arn != primary_arn]
+        return primary_arn, alt_arns
+
+    def _build_retrieve_config_template(self) -> Dict:
+        """retrieveAndGenerateConfiguration shared by every query (modelArn is filled in per call)"""
+        return {
+            'type': 'KNOWLEDGE_BASE',
+            'knowledgeBaseConfiguration': {
+                'knowledgeBaseId': str(self.kb_id).strip(),
+                'modelArn': None,  # set per query
+                'retrievalConfiguration': {
+                    'vectorSearchConfiguration': {
+                        'numberOfResults': 5
+                    }
+                },
+                'orchestrationConfiguration': {
+                    'promptTemplate': {
+                        'textPromptTemplate': ORCHESTRATION_PROMPT_TEMPLATE
+                    }
+                },
+                'generationConfiguration': {
+                    'promptTemplate': {
+                        'textPromptTemplate': GENERATION_PROMPT_TEMPLATE
+                    }
+                }
+            }
+        }
+
     def query(self, question: str, session_id: Optional[str] = None,
              conversation_history: Optional[List[Dict]] = None,
              query_type: Optional[str] = None,
@@ -83,30 +324,19 @@ class BedrockKnowledgeBase:
         Returns:
             Dictionary with answer, sources, and metadata
         """
-        if not self.kb_id:
-            logger.error("Knowledge Base ID not configured")
-            raise ValueError("Knowledge Base ID not configured")
+        if self._config_error:
+            logger.error(self._config_error)
+            raise ValueError(self._config_error)
 
-        start_time = time.time()
-        logger.debug(f"Querying KB: '{question[:100]}...' (session: {session_id[:8] if session_id else 'new'})")
+        start_time = time.perf_counter()
+        logger.debug("Querying KB: '%.100s...' (session: %.8s)", question, session_id or 'new')
 
         try:
             # Validate input
-            if not question or not isinstance(question, str):
-                raise ValueError("Question must be a non-empty string")
-
-            question = question.strip()
+            question = question.strip() if question else ''
             if not question:
                 raise ValueError("Question cannot be empty or whitespace only")
 
-            # Validate KB ID
-            if not self.kb_id or not isinstance(self.kb_id, str) or not self.kb_id.strip():
-                raise ValueError("Knowledge Base ID is not configured or invalid")
-
-            # Validate model ID
-            if not self.model_id or not isinstance(self.model_id, str) or not self.model_id.strip():
-                raise ValueError("Model ID is not configured or invalid")
-
             # Enhance query with conversation history if available
             enhanced_question = question  # Already stripped above
             if use_advanced_prompts and self.prompt_engine and conversation_history:
@@ -115,7 +345,8 @@ class BedrockKnowledgeBase:
                 if not enhanced_question or not isinstance(enhanced_question, str):
                     logger.warning("Enhanced question is invalid, using original question")
                     enhanced_question = question
-                enhanced_question = enhanced_question.strip()  # Ensure no leading/trailing whitespace
+                elif enhanced_question is not question:
+                    enhanced_question = enhanced_question.strip()  # Ensure no leading/trailing whitespace
                 if not enhanced_question:
                     logger.warning("Enhanced question is empty after stripping, using original question")
                     enhanced_question = question
@@ -127,76 +358,10 @@ class BedrockKnowledgeBase:
 
             # Validate session ID format if provided (pattern: [0-9a-zA-Z._:-]+)
             if session_id:
-                import re
-                if not re.match(r'^[0-9a-zA-Z._:-]+$', session_id):
+                if not _SESSION_ID_RE.match(session_id):
                     logger.warning(f"Invalid session ID format: {session_id}. Creating new session.")
                     session_id = None
 
-            # Helper function to build retrieveAndGenerateConfiguration
-            def build_retrieve_config(model_arn_value):
-                """Build retrieveAndGenerateConfiguration for new sessions"""
-                return {
-                    'type': 'KNOWLEDGE_BASE',
-                    'knowledgeBaseConfiguration': {
-                        'knowledgeBaseId': str(self.kb_id).strip(),
-                        'modelArn': str(model_arn_value).strip(),
-                        'retrievalConfiguration': {
-                            'vectorSearchConfiguration': {
-                                'numberOfResults': 5
-                            }
-                        },
-                        'orchestrationConfiguration': {
-                            'promptTemplate': {
-                                'textPromptTemplate': """Review the following retrieved documents and prepare a comprehensive context to help answer the user's question. Organize the information logically and include all relevant details.
-
-Retrieved Documents:
-$search_results$
-
-User Question:
-$query$
-
-Conversation History:
-$conversation_history$
-
-Output Format Instructions:
-$output_format_instructions$
-
-Organized Context:"""
-                            }
-                        },
-                        'generationConfiguration': {
-                            'promptTemplate': {
-                                'textPromptTemplate': """Use the following pieces of context to answer the question at the end. If you don't know the answer, just say that you don't know, don't try to make up an answer.
-
-Context:
-$search_results$
-
-Question: $query$
-
-Answer:"""
-                            }
-                        }
-                    }
-                }
-
-            # Helper function to construct model ARN
-            def get_model_arn():
-                """Construct foundation model ARN from model_id"""
-                if self.model_id.startswith('arn:aws:bedrock:'):
-                    if ':inference-profile/' in self.model_id:
-                        logger.warning(f"Inference profile ARN provided, but foundation model ARN is required. Will attempt conversion in retry logic.")
-                        return self.model_id
-                    else:
-                        logger.debug(f"Using provided foundation model ARN: {self.model_id}")
-                        return self.model_id
-                else:
-                    # Construct foundation model ARN using the full model ID (including version suffix)
-                    # According to foundation-models.txt, the modelArn format is:
-                    # arn:aws:bedrock:<region>::foundation-model/<full-model-id>
-                    model_arn = f"arn:aws:bedrock:{self.region}::foundation-model/{self.model_id}"
-                    logger.debug(f"Constructed foundation model ARN: {model_arn}")
-                    return model_arn
-
             # Prepare the query parameters according to AWS Bedrock API documentation:
             # https://docs.aws.amazon.com/bedrock/latest/APIReference/API_agent-runtime_RetrieveAndGenerate.html
             # Required: input
@@ -208,16 +373,20 @@ Answer:"""
             }
 
             # Always include retrieveAndGenerateConfiguration for both new and existing sessions
-            model_arn = get_model_arn()
-            params['retrieveAndGenerateConfiguration'] = build_retrieve_config(model_arn)
+            model_arn = self._primary_model_arn
+            kb_config = self._retrieve_config_template['knowledgeBaseConfiguration']
+            params['retrieveAndGenerateConfiguration'] = {
+                **self._retrieve_config_template,
+                'knowledgeBaseConfiguration': {**kb_config, 'modelArn': model_arn}
+            }
 
             # If sessionId is provided from UI, preserve it and include it in the request
             # This allows continuing the conversation while ensuring configuration is always present
             if session_id:
                 params['sessionId'] = session_id
-                logger.debug(f"Using session ID from UI: {session_id[:8]}... with retrieveAndGenerateConfiguration")
+                logger.debug("Using session ID from UI: %.8s... with retrieveAndGenerateConfiguration", session_id)
             else:
-                logger.debug(f"Creating new session with model ARN: {model_arn}")
+                logger.debug("Creating new session with model ARN: %s", model_arn)
 
             # Validate parameters structure before API call
             # Required: input must be present
@@ -229,38 +398,41 @@ Answer:"""
                 raise ValueError("Missing required 'retrieveAndGenerateConfiguration'")
 
             # Query the Knowledge Base
-            logger.debug(f"Calling Bedrock retrieve_and_generate API")
-            logger.debug(f"Params keys: {list(params.keys())}")
-            logger.debug(f"Has sessionId: {'sessionId' in params}")
-            logger.debug(f"Has retrieveAndGenerateConfiguration: {'retrieveAndGenerateConfiguration' in params}")
-            if 'retrieveAndGenerateConfiguration' in params:
-                logger.debug(f"retrieveAndGenerateConfiguration type: {params['retrieveAndGenerateConfiguration'].get('type')}")
-                logger.debug(f"KB ID in config: {params['retrieveAndGenerateConfiguration'].get('knowledgeBaseConfiguration', {}).get('knowledgeBaseId')}")
-                logger.debug(f"Model ARN in config: {params['retrieveAndGenerateConfiguration'].get('knowledgeBaseConfiguration', {}).get('modelArn')}")
-            logger.debug(f"Input text length: {len(params.get('input', {}).get('text', ''))}")
-            # Sanitize params for logging (hide full input text)
-            sanitized_params = {}
-            for k, v in params.items():
-                if k == 'input':
-                    sanitized_params[k] = {'text': f'[text length: {len(v.get("text", ""))}]'}
-                else:
-                    sanitized_params[k] = v
-            logger.debug(f"Full params structure (sanitized): {json.dumps(sanitized_params, default=str, indent=2)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Calling Bedrock retrieve_and_generate API")
+                logger.debug(f"Params keys: {list(params.keys())}")
+                logger.debug(f"Has sessionId: {'sessionId' in params}")
+                logger.debug(f"Has retrieveAndGenerateConfiguration: {'retrieveAndGenerateConfiguration' in params}")
+                if 'retrieveAndGenerateConfiguration' in params:
+                    logger.debug(f"retrieveAndGenerateConfiguration type: {params['retrieveAndGenerateConfiguration'].get('type')}")
+                    logger.debug(f"KB ID in config: {params['retrieveAndGenerateConfiguration'].get('knowledgeBaseConfiguration', {}).get('knowledgeBaseId')}")
+                    logger.debug(f"Model ARN in config: {params['retrieveAndGenerateConfiguration'].get('knowledgeBaseConfiguration', {}).get('modelArn')}")
+                logger.debug(f"Input text length: {len(params.get('input', {}).get('text', ''))}")
+                # Sanitize params for logging (hide full input text)
+                sanitized_params = {}
+                for k, v in params.items():
+                    if k == 'input':
+                        sanitized_params[k] = {'text': f'[text length: {len(v.get("text", ""))}]'}
+                    else:
+                        sanitized_params[k] = v
+                logger.debug("Full params structure (sanitized): %s", _LazyJSON(sanitized_params))
 
-            try:
                 # Log exact parameters being sent (for debugging)
                 if session_id:
                     logger.debug(f"API call with existing session - params: input (text length: {len(params['input']['text'])}), sessionId: {session_id[:8]}...")
                 else:
                     logger.debug(f"API call with new session - params: input (text length: {len(params['input']['text'])}), retrieveAndGenerateConfiguration present")
 
-                response = self.bedrock_agent.retrieve_and_generate(**params)
+            try:
+                response = self._retrieve_and_generate(params)
             except ClientError as e:
                 error_code = e.response.get('Error', {}).get('Code', 'Unknown')
                 error_message = e.response.get('Error', {}).get('Message', str(e))
 
                 logger.error(f"Bedrock API error: code={error_code}, message={error_message}")
 
+                if error_code in THROTTLING_ERROR_CODES:
+                    raise BedrockThrottlingError(f"AWS Error ({error_code}): {error_message}")
 
                 # If it's a validation error related to model identifier, try alternative model formats
                 if (error_code == 'ValidationException' and
@@ -276,47 +448,21 @@ Answer:"""
                         logger.warning(f"Validation error with model: {current_model_arn}. Error: {error_message}")
                         logger.warning("Trying alternative model identifier formats...")
 
-                        # Try alternative model ARN formats in order of likelihood
-                        # Use foundation model ARN format with full model ID (including version suffix)
-                        # According to foundation-models.txt, modelArn format is:
-                        # arn:aws:bedrock:<region>::foundation-model/<full-model-id>
-                        model_arn_attempts = []
-
-                        # Try 1: Foundation model ARN format with full model ID (as per foundation-models.txt)
-                        foundation_arn = f"arn:aws:bedrock:{self.region}::foundation-model/{self.model_id}"
-                        if foundation_arn != current_model_arn:
-                            model_arn_attempts.append(foundation_arn)
-
-                        # Try 2: Alternative Claude 3.5 Sonnet versions (if current model doesn't work)
-                        if 'claude-3-5-sonnet' in self.model_id.lower():
-                            # Try the older version that supports ON_DEMAND
-                            alt_model = 'anthropic.claude-3-5-sonnet-20240620-v1:0'
-                            if alt_model != self.model_id:
-                                alt_foundation_arn = f"arn:aws:bedrock:{self.region}::foundation-model/{alt_model}"
-                                if alt_foundation_arn != current_model_arn and alt_foundation_arn not in model_arn_attempts:
-                                    model_arn_attempts.append(alt_foundation_arn)
-
-                        # Try 3: Base model ID without version suffix (fallback)
-                        if ':' in self.model_id:
-                            base_model_id = self.model_id.split(':')[0]
-                            base_foundation_arn = f"arn:aws:bedrock:{self.region}::foundation-model/{base_model_id}"
-                            if base_foundation_arn != current_model_arn and base_foundation_arn not in model_arn_attempts:
-                                model_arn_attempts.append(base_foundation_arn)
-
-                        # Try each alternative format
+                        # Alternative model ARN formats, precomputed in __init__
+                        model_arn_attempts = [arn for arn in self._alt_model_arns if arn != current_model_arn]
+
+                        # Try the alternative formats in order, keeping the first success
                         retry_success = False
                         last_error = None
-                        for i, alt_model_arn in enumerate(model_arn_attempts):
+                        if model_arn_attempts:
                             try:
+                                response, alt_model_arn = self._retry_with_model_arns(params, model_arn_attempts)
                                 params['retrieveAndGenerateConfiguration']['knowledgeBaseConfiguration']['modelArn'] = alt_model_arn
-                                logger.info(f"Retry attempt {i+1}/{len(model_arn_attempts)}: Trying model identifier: {alt_model_arn}")
-                                response = self.bedrock_agent.retrieve_and_generate(**params)
                                 logger.info(f"✓ Successfully retried with model identifier: {alt_model_arn}")
                                 retry_success = True
-                                break  # Success, exit retry loop
+                            except BedrockThrottlingError:
+                                raise
                             except Exception as retry_e:
-                                retry_error_msg = str(retry_e)
-                                logger.debug(f"Retry {i+1} failed: {retry_error_msg}")
                                 last_error = retry_e
 
                         if not retry_success:
@@ -325,45 +471,42 @@ Answer:"""
                             logger.error(f"Original model identifier: {current_model_arn}")
                             logger.error(f"Tried alternatives: {model_arn_attempts}")
                             logger.error(f"Last error: {last_error}", exc_info=True)
-                            logger.error(f"Original params: {json.dumps(params, default=str, indent=2)}")
+                            logger.error("Original params: %s", _LazyJSON(params))
                             raise Exception(f"AWS Error ({error_code}): {error_message}. Tried {len(model_arn_attempts)} alternative model formats, all failed.")
                     else:
                         # Not a model error, raise the original error
-                        logger.error(f"Bedrock API call failed. Params: {json.dumps(params, default=str, indent=2)}", exc_info=True)
+                        logger.error("Bedrock API call failed. Params: %s", _LazyJSON(params), exc_info=True)
                         raise Exception(f"AWS Error ({error_code}): {error_message}")
                 else:
                     # Not a handled error case, raise the original error
-                    logger.error(f"Bedrock API call failed. Params: {json.dumps(params, default=str, indent=2)}", exc_info=True)
+                    logger.error("Bedrock API call failed. Params: %s", _LazyJSON(params), exc_info=True)
                     raise Exception(f"AWS Error ({error_code}): {error_message}")
             except Exception as e:
-                logger.error(f"Bedrock API call failed. Params: {json.dumps(params, default=str, indent=2)}", exc_info=True)
+                logger.error("Bedrock API call failed. Params: %s", _LazyJSON(params), exc_info=True)
                 raise
 
             # Calculate response time
-            response_time_ms = int((time.time() - start_time) * 1000)
+            response_time_ms = int((time.perf_counter() - start_time) * 1000)
             logger.info(f"KB query completed in {response_time_ms}ms")
 
             # Extract answer and sources
             answer = response.get('output', {}).get('text', 'No answer found')
             citations = response.get('citations', [])
 
-            # Format sources with enhanced information
-            sources = []
-            for citation in citations:
-                retrieved_references = citation.get('retrievedReferences', [])
-                for ref in retrieved_references:
-                    location = ref.get('location', {})
-                    s3_location = location.get('s3Location', {})
-
-                    source_info = {
-                        'content': ref.get('content', {}).get('text', ''),
-                        'location': location,
-                        's3_uri': s3_location.get('uri', ''),
-                        's3_key': s3_location.get('uri', '').split('/')[-1] if s3_location.get('uri') else '',
-                        'score': ref.get('score', 0),
-                        'type': ref.get('content', {}).get('type', 'text')
-                    }
-                    sources.append(source_info)
+            # Format sources with enhanced information (one flat pass over all references;
+            # dict entries evaluate in order, so content/location are bound before reuse)
+            sources = [
+                {
+                    'content': (content := ref.get('content') or {}).get('text', ''),
+                    'location': (location := ref.get('location') or {}),
+                    's3_uri': (s3_uri := (location.get('s3Location') or {}).get('uri') or ''),
+                    's3_key': s3_uri.rpartition('/')[2],
+                    'score': ref.get('score', 0),
+                    'type': content.get('type', 'text')
+                }
+                for citation in citations
+                for ref in citation.get('retrievedReferences', ())
+            ]
 
             # Extract session ID from response
             response_session_id = response.get('sessionId') or params.get('sessionId')
@@ -402,25 +545,94 @@ Answer:"""
                 raise Exception(helpful_msg)
 
             raise Exception(f"AWS Error ({error_code}): {error_message}")
+        except BedrockThrottlingError:
+            raise
         except Exception as e:
             logger.error(f"Failed to query knowledge base: {str(e)}", exc_info=True)
             raise Exception(f"Failed to query knowledge base: {str(e)}")
 
-    def upload_to_s3(self, file_path: str, s3_key: str) -> bool:
+    def _retrieve_and_generate(self, params: Dict) -> Dict:
+        """
+        Call retrieve_and_generate, retrying transient failures with exponential backoff
+
+        5xx responses and connection errors are retried up to TRANSIENT_MAX_ATTEMPTS
+        times. Throttling and every other error are raised at once, so throttling still
+        reaches AdaptiveThrottle without delay.
+        """
+        for attempt in range(1, TRANSIENT_MAX_ATTEMPTS + 1):
+            try:
+                return self.bedrock_agent.retrieve_and_generate(**params)
+            except ClientError as e:
+                error_code = e.response.get('Error', {}).get('Code', 'Unknown')
+                status = e.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+                if (error_code in THROTTLING_ERROR_CODES or status < 500
+                        or attempt == TRANSIENT_MAX_ATTEMPTS):
+                    raise
+                logger.warning(f"Bedrock transient error ({error_code}, HTTP {status}), "
+                               f"retrying (attempt {attempt}/{TRANSIENT_MAX_ATTEMPTS})")
+            except (BotoConnectionError, ConnectionClosedError) as e:
+                if attempt == TRANSIENT_MAX_ATTEMPTS:
+                    raise
+                logger.warning(f"Bedrock connection error, retrying "
+                               f"(attempt {attempt}/{TRANSIENT_MAX_ATTEMPTS}): {e}")
+            time.sleep(TRANSIENT_BACKOFF_BASE * 2 ** (attempt - 1))
+
+    def _retry_with_model_arns(self, params: Dict, model_arn_attempts: List[str]):
+        """
+        Call retrieve_and_generate with each alternative model ARN in turn
+
+        Attempts run one at a time in priority order, stopping at the first success,
+        so a session never gets concurrent turns and the calls stay within the
+        caller's single throttle slot. Throttling ends the retries and is raised as
+        BedrockThrottlingError.
+
+        Returns:
+            (response, model_arn) of the first attempt to succeed; raises the last
+            error if every attempt fails
         """
-        Upload a file to S3 bucket
+        last_error = None
+        for i, alt_model_arn in enumerate(model_arn_attempts):
+            attempt_params = copy.deepcopy(params)
+            attempt_params['retrieveAndGenerateConfiguration']['knowledgeBaseConfiguration']['modelArn'] = alt_model_arn
+            logger.info(f"Retry attempt {i+1}/{len(model_arn_attempts)}: Trying model identifier: {alt_model_arn}")
+            try:
+                return self._retrieve_and_generate(attempt_params), alt_model_arn
+            except ClientError as retry_e:
+                error_code = retry_e.response.get('Error', {}).get('Code', 'Unknown')
+                if error_code in THROTTLING_ERROR_CODES:
+                    error_message = retry_e.response.get('Error', {}).get('Message', str(retry_e))
+                    raise BedrockThrottlingError(f"AWS Error ({error_code}): {error_message}") from retry_e
+                logger.debug(f"Retry with {alt_model_arn} failed: {retry_e}")
+                last_error = retry_e
+            except Exception as retry_e:
+                logger.debug(f"Retry with {alt_model_arn} failed: {retry_e}")
+                last_error = retry_e
+        raise last_error
+
+    def upload_stream_to_s3(self, fileobj: BinaryIO, s3_key: str,
+                            content_type: Optional[str] = None) -> bool:
+        """
+        Upload a file-like object to S3 bucket without writing it to local disk
 
         Args:
-            file_path: Local file path
+            fileobj: Readable binary file-like object (e.g. an upload stream)
             s3_key: S3 object key
+            content_type: Optional MIME type stored as the object's Content-Type
 
         Returns:
             True if successful
         """
-        logger.info(f"Uploading file to S3: {s3_key} (bucket: {self.s3_bucket})")
+        logger.info(f"Streaming upload to S3: {s3_key} (bucket: {self.s3_bucket})")
+        extra_args = {'ContentType': content_type} if content_type else None
         try:
-            self.s3.upload_file(file_path, self.s3_bucket, s3_key)
-            logger.info(f"File uploaded successfully to S3: {s3_key}")
+            self.s3.upload_fileobj(
+                fileobj,
+                self.s3_bucket,
+                s3_key,
+                ExtraArgs=extra_args,
+                Config=UPLOAD_TRANSFER_CONFIG
+            )
+            logger.info(f"File streamed successfully to S3: {s3_key}")
             return True
         except ClientError as e:
             error_code = e.response.get('Error', {}).get('Code', 'Unknown')
@@ -446,32 +658,33 @@ Answer:"""
         """
         logger.debug(f"Getting KB status for {self.kb_id}")
         try:
-            # Get Knowledge Base details
-            kb_response = self.bedrock_agent_client.get_knowledge_base(
-                knowledgeBaseId=self.kb_id
-            )
-            logger.debug("KB details retrieved successfully")
-
-            kb_details = kb_response.get('knowledgeBase', {})
-
-            # Get data sources
-            data_sources = []
-            try:
-                ds_response = self.bedrock_agent_client.list_data_sources(
-                    knowledgeBaseId=self.kb_id
-                )
-                data_sources = ds_response.get('dataSourceSummaries', [])
-            except Exception:
-                pass
-
-            # Count objects in S3 (approximate)
-            s3_count = 0
-            try:
-                paginator = self.s3.get_paginator('list_objects_v2')
-                for page in paginator.paginate(Bucket=self.s3_bucket, Prefix='documents/'):
-                    s3_count += len(page.get('Contents', []))
-            except Exception:
-                pass
+            # The three lookups are independent, so issue them concurrently
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                kb_future = executor.submit(self.bedrock_agent_client.get_knowledge_base,
+                                            knowledgeBaseId=self.kb_id)
+                ds_future = executor.submit(self.bedrock_agent_client.list_data_sources,
+                                            knowledgeBaseId=self.kb_id)
+                s3_future = executor.submit(self._list_document_objects)
+
+                # Get Knowledge Base details
+                kb_response = kb_future.result()
+                logger.debug("KB details retrieved successfully")
+
+                kb_details = kb_response.get('knowledgeBase', {})
+
+                # Get data sources
+                data_sources = []
+                try:
+                    data_sources = ds_future.result().get('dataSourceSummaries', [])
+                except Exception:
+                    pass
+
+                # Count objects in S3 (approximate)
+                s3_count = 0
+                try:
+                    s3_count = len(s3_future.result())
+                except Exception:
+                    pass
 
             return {
                 'knowledge_base_id': self.kb_id,
@@ -538,59 +751,91 @@ Answer:"""
 
             raise Exception(f"Failed to start ingestion job: {error_message}")
 
+    def _list_document_objects(self) -> List[Dict]:
+        """
+        List every S3 object under documents/, in key order
+
+        A single page is returned as is; larger buckets are listed as
+        LIST_SHARD_BOUNDARIES key ranges in parallel instead of page by page.
+        """
+        first_page = self.s3.list_objects_v2(Bucket=self.s3_bucket, Prefix='documents/')
+        if not first_page.get('IsTruncated'):
+            return first_page.get('Contents', [])
+
+        bounds = [None, *LIST_SHARD_BOUNDARIES, None]
+        with ThreadPoolExecutor(max_workers=LIST_SHARD_WORKERS) as executor:
+            shards = executor.map(self._list_key_range, bounds[:-1], bounds[1:])
+            return list(chain.from_iterable(shards))
+
+    def _list_key_range(self, start_after: Optional[str], end: Optional[str]) -> List[Dict]:
+        """Objects under documents/ with start_after < key <= end (None leaves a side open)"""
+        kwargs = {'Bucket': self.s3_bucket, 'Prefix': 'documents/'}
+        if start_after:
+            kwargs['StartAfter'] = start_after
+
+        objects = []
+        paginator = self.s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(**kwargs):
+            for obj in page.get('Contents', []):
+                if end is not None and obj['Key'] > end:
+                    return objects
+                objects.append(obj)
+        return objects
+
     def list_documents(self) -> List[Dict]:
-            """
-            List all documents in the knowledge base S3 bucket with their sizes
-            
-            Returns:
-                List of dictionaries with 'name' and 'size' keys
-            """
-            logger.debug(f"Listing documents from S3 bucket: {self.s3_bucket}")
-            documents = []
-            
-            try:
-                paginator = self.s3.get_paginator('list_objects_v2')
-                for page in paginator.paginate(Bucket=self.s3_bucket, Prefix='documents/'):
-                    for obj in page.get('Contents', []):
-                        # Extract document name from S3 key (remove 'documents/' prefix)
-                        s3_key = obj.get('Key', '')
-                        if s3_key.startswith('documents/'):
-                            doc_name = s3_key.replace('documents/', '', 1)
-                        else:
-                            doc_name = s3_key.split('/')[-1]  # Fallback to filename
-                        
-                        size_bytes = obj.get('Size', 0)
-                        
-                        documents.append({
-                            'name': doc_name,
-                            'size': size_bytes
-                        })
-                
-                logger.info(f"Found {len(documents)} documents in knowledge base")
-                return documents
-            except ClientError as e:
-                error_code = e.response.get('Error', {}).get('Code', 'Unknown')
-                error_message = e.response.get('Error', {}).get('Message', str(e))
-                logger.error(f"Failed to list documents from S3 ({error_code}): {error_message}", exc_info=True)
-                raise Exception(f"Failed to list documents: {error_message}")
-            except Exception as e:
-                logger.error(f"Failed to list documents: {str(e)}", exc_info=True)
-                raise Exception(f"Failed to list documents: {str(e)}")
+        """
+        List all documents in the knowledge base S3 bucket with their sizes
+
+        Returns:
+            List of dictionaries with 'name' and 'size' keys
+        """
+        logger.debug(f"Listing documents from S3 bucket: {self.s3_bucket}")
+        prefix = 'documents/'
+        prefix_len = len(prefix)
+
+        try:
+            # Document name is the S3 key without the 'documents/' prefix (Key and Size
+            # are always present in list_objects_v2 entries)
+            documents = [
+                {
+                    'name': key[prefix_len:] if (key := obj['Key']).startswith(prefix) else key.rpartition('/')[2],
+                    'size': obj['Size']
+                }
+                for obj in self._list_document_objects()
+            ]
+
+            logger.info(f"Found {len(documents)} documents in knowledge base")
+            return documents
+        except ClientError as e:
+            error_code = e.response.get('Error', {}).get('Code', 'Unknown')
+            error_message = e.response.get('Error', {}).get('Message', str(e))
+            logger.error(f"Failed to list documents from S3 ({error_code}): {error_message}", exc_info=True)
+            raise Exception(f"Failed to list documents: {error_message}")
+        except Exception as e:
+            logger.error(f"Failed to list documents: {str(e)}", exc_info=True)
+            raise Exception(f"Failed to list documents: {str(e)}")
 
     def health_check(self) -> bool:
             """
-            Check if Bedrock service is accessible
+            Check if Bedrock service is accessible (successes cached for HEALTH_CHECK_CACHE_TTL seconds)
             
             Returns:
                 True if service is healthy
             """
+            cached_at = self._health_check_cache
+            if cached_at is not None and time.monotonic() - cached_at < HEALTH_CHECK_CACHE_TTL:
+                return True
+            
             logger.debug(f"Performing health check for KB: {self.kb_id}")
+            checked_at = time.monotonic()
             try:
                 # Simple check - try to describe the knowledge base
                 self.bedrock_agent_client.get_knowledge_base(knowledgeBaseId=self.kb_id)
                 logger.debug("Health check passed")
-                return True
             except Exception as e:
                 logger.warning(f"Health check failed: {str(e)}")
+                self._health_check_cache = None
                 return False
+            self._health_check_cache = checked_at
+            return True
 
@@ -0,0 +1,96 @@
+"""
+Client-side adaptive throttle for Bedrock calls
+"""
+import time
+import threading
+from collections import deque
+
+try:
+    from config.logging_config import get_logger
+except ImportError:
+    from ..config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class AdaptiveThrottle:
+    """
+    AIMD concurrency controller with an optional requests-per-minute window
+
+    The allowed concurrency grows additively (+0.5) after each successful call and
+    halves whenever Bedrock reports throttling, so callers back off to the rate the
+    service is actually accepting instead of failing in bursts.
+
+    All state is per process. Under gunicorn each worker has its own throttle, so
+    max_concurrency and requests_per_minute are per-worker budgets (the total is
+    multiplied by the worker count), and with sync workers in_flight never exceeds 1,
+    leaving the window as the only limit that can block.
+    """
+
+    def __init__(self, max_concurrency: int = 8, requests_per_minute: int = 0,
+                 acquire_timeout: float = 10.0):
+        """
+        Args:
+            max_concurrency: Upper bound for concurrent calls
+            requests_per_minute: Sliding-window call limit (0 disables the window)
+            acquire_timeout: Seconds to wait for a slot before giving up
+        """
+        # Clamped so a bad setting degrades to one slot / no window instead of failing acquire()
+        self.max_concurrency = max(1, max_concurrency)
+        self.requests_per_minute = max(0, requests_per_minute)
+        self.acquire_timeout = acquire_timeout
+        self.concurrency = float(self.max_concurrency)
+        self.in_flight = 0
+        self._calls = deque()
+        self._cond = threading.Condition()
+
+    def _window_wait(self, now: float) -> float:
+        """Seconds until the sliding window has room (0 if it has room now)"""
+        if not self.requests_per_minute:
+            return 0
+        while self._calls and self._calls[0] <= now - 60:
+            self._calls.popleft()
+        if len(self._calls) < self.requests_per_minute:
+            return 0
+        return self._calls[0] + 60 - now
+
+    def acquire(self) -> bool:
+        """Wait for a call slot; returns False if none frees up within acquire_timeout"""
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                window_wait = self._window_wait(now)
+                if self.in_flight < max(1, int(self.concurrency)) and window_wait == 0:
+                    self.in_flight += 1
+                    if self.requests_per_minute:
+                        self._calls.append(now)
+                    return True
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    logger.warning(f"Bedrock throttle: no slot within {self.acquire_timeout}s "
+                                   f"(in flight: {self.in_flight}, concurrency: {self.concurrency:.1f})")
+                    return False
+                self._cond.wait(min(remaining, window_wait) if window_wait else remaining)
+
+    def release(self):
+        """Release a slot without adjusting concurrency (e.g. non-throttling errors)"""
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._cond.notify_all()
+
+    def on_success(self):
+        """Release a slot and additively increase concurrency"""
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            self.concurrency = min(self.max_concurrency, self.concurrency + 0.5)
+            self._cond.notify_all()
+
+    def on_throttle(self):
+        """Release a slot and multiplicatively decrease concurrency"""
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            self.concurrency = max(1.0, self.concurrency * 0.5)
+            self._cond.notify_all()
+        logger.warning(f"Bedrock throttled request, concurrency reduced to {self.concurrency:.1f}")
@@ -1,10 +1,18 @@
 """
 Advanced prompt engineering for Bedrock Knowledge Base
 """
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime
+from string import Formatter
+from functools import lru_cache, cached_property
+import re
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 try:
     from config.logging_config import get_logger
 except ImportError:
@@ -12,6 +20,36 @@ except ImportError:
 
 logger = get_logger(__name__)
 
+# Checked in order, first hit wins. Plain substring alternations (no word
+# boundaries) so 'how' still matches inside 'show', as the keyword lists did.
+QUERY_TYPE_PATTERNS = (
+    ('technical', re.compile('how|implement|configure|setup|technical|specification')),
+    ('summary', re.compile('summarize|summary|overview|brief')),
+    ('comparison', re.compile('compare|difference|versus|vs|better')),
+)
+
+
+@lru_cache(maxsize=2048)
+def classify_query(question: str) -> str:
+    """Map a question to its query type (pure, so repeated questions are a cache hit)"""
+    question_lower = question.lower()
+    for query_type, pattern in QUERY_TYPE_PATTERNS:
+        if pattern.search(question_lower):
+            return query_type
+    return 'general'
+
+
+@lru_cache(maxsize=1024)
+def _render_enhanced_query(question: str, recent_exchanges: Tuple[Tuple[str, str], ...]) -> str:
+    """Render a question with its last (question, truncated answer) exchanges (pure, so cached)"""
+    parts = ["Context from previous conversation:"]
+    append = parts.append
+    for previous_question, previous_answer in recent_exchanges:
+        append(f"Previous question: {previous_question}")
+        append(f"Previous answer: {previous_answer}...")
+    append(f"\nCurrent question: {question}")
+    return "\n".join(parts)
+
 
 class PromptEngine:
     """Advanced prompt engineering with system prompts, few-shot examples, and templates"""
@@ -25,11 +63,47 @@ class PromptEngine:
         """
         logger.debug("Initializing PromptEngine")
         self.config = config
-        self.system_prompt = self._load_system_prompt()
-        self.few_shot_examples = self._load_few_shot_examples()
-        self.prompt_templates = self._load_prompt_templates()
+        # (include_system_prompt, include_examples) -> rendered static prefix
+        self._static_prefix_cache = {}
+    
+    # Prompts, examples and templates are loaded on first use (query enhancement and
+    # type detection never need them); call warmup() to load them up front.
+    # The engine is shared across request threads: two threads racing on first access
+    # both compute the same value and one assignment wins, which is harmless.
+    @cached_property
+    def system_prompt(self) -> str:
+        return self._load_system_prompt()
+    
+    @cached_property
+    def few_shot_examples(self) -> List[Dict]:
+        return self._load_few_shot_examples()
+    
+    @cached_property
+    def prompt_templates(self) -> Dict[str, str]:
+        return self._load_prompt_templates()
+    
+    @cached_property
+    def _compiled_templates(self) -> Dict[str, List[Tuple[str, Optional[str]]]]:
+        # Templates pre-split into (literal, field) pairs so rendering is a plain join
+        return {name: self._compile_template(template) for name, template in self.prompt_templates.items()}
+    
+    @cached_property
+    def _rendered_examples_block(self) -> str:
+        return self._format_examples(self.few_shot_examples[:2])  # Use 2 examples
+    
+    def warmup(self):
+        """Load prompts, examples and templates now instead of on the first prompt build"""
+        self._compiled_templates
+        self._rendered_examples_block
+        self.system_prompt
         logger.info(f"PromptEngine initialized ({len(self.prompt_templates)} templates, {len(self.few_shot_examples)} examples)")
     
+    def refresh_cache(self):
+        """Rebuild derived prompt pieces - call after changing templates or examples in place"""
+        self.__dict__.pop('_compiled_templates', None)
+        self.__dict__.pop('_rendered_examples_block', None)
+        self._static_prefix_cache = {}
+    
     def _load_system_prompt(self) -> str:
         """Load system prompt from config or use default"""
         default_prompt = """You are a helpful AI assistant with access to a knowledge base. 
@@ -63,7 +137,7 @@ Guidelines:
         examples_json = self.config.get('FEW_SHOT_EXAMPLES', '[]')
         try:
             if isinstance(examples_json, str):
-                return json.loads(examples_json)
+                return orjson.loads(examples_json) if orjson is not None else json.loads(examples_json)
             elif isinstance(examples_json, list):
                 return examples_json
             else:
@@ -108,7 +182,8 @@ Compare and contrast the relevant information from the context to answer the que
     def build_prompt(self, question: str, context: List[Dict], 
                     query_type: str = 'general',
                     include_system_prompt: bool = True,
-                    include_examples: bool = False) -> str:
+                    include_examples: bool = False,
+                    split_static_prefix: bool = False) -> Union[str, Tuple[str, str]]:
         """
         Build an advanced prompt with system instructions and context
         
@@ -118,34 +193,50 @@ Compare and contrast the relevant information from the context to answer the que
             query_type: Type of query (general, technical, summary, comparison)
             include_system_prompt: Whether to include system prompt
             include_examples: Whether to include few-shot examples
+            split_static_prefix: Return (static_prefix, dynamic_suffix) instead of one string,
+                so callers can send the unchanging prefix as a prompt-cacheable block
         
         Returns:
-            Formatted prompt string
+            Formatted prompt string, or a (static_prefix, dynamic_suffix) tuple
         """
-        # Format context
-        context_text = self._format_context(context)
-        
-        # Get template
-        template = self.prompt_templates.get(query_type, self.prompt_templates['general'])
-        
-        # Build prompt parts
-        prompt_parts = []
-        
-        if include_system_prompt:
-            prompt_parts.append(f"System Instructions:\n{self.system_prompt}\n")
+        static_prefix = self._static_prefix(include_system_prompt, include_examples)
+        dynamic_suffix = self._render(query_type, self._format_context(context), question)
         
-        if include_examples and self.few_shot_examples:
-            examples_text = self._format_examples(self.few_shot_examples[:2])  # Use 2 examples
-            prompt_parts.append(f"Examples:\n{examples_text}\n")
-        
-        # Add main prompt
-        main_prompt = template.format(
-            context=context_text,
-            question=question
-        )
-        prompt_parts.append(main_prompt)
-        
-        return "\n\n".join(prompt_parts)
+        if split_static_prefix:
+            return static_prefix, dynamic_suffix
+        return f"{static_prefix}\n\n{dynamic_suffix}" if static_prefix else dynamic_suffix
+    
+    def _static_prefix(self, include_system_prompt: bool, include_examples: bool) -> str:
+        """System instructions and few-shot examples - config-fixed, so rendered once per combination"""
+        key = (include_system_prompt, include_examples)
+        prefix = self._static_prefix_cache.get(key)
+        if prefix is None:
+            prompt_parts = []
+            
+            if include_system_prompt:
+                prompt_parts.append(f"System Instructions:\n{self.system_prompt}\n")
+            
+            if include_examples and self.few_shot_examples:
+                prompt_parts.append(f"Examples:\n{self._rendered_examples_block}\n")
+            
+            prefix = self._static_prefix_cache[key] = "\n\n".join(prompt_parts)
+        return prefix
+    
+    @staticmethod
+    def _compile_template(template: str) -> List[Tuple[str, Optional[str]]]:
+        """Parse a str.format template once into (literal text, field name or None) pairs"""
+        return [(literal, field_name) for literal, field_name, _, _ in Formatter().parse(template)]
+    
+    def _render(self, query_type: str, context_text: str, question: str) -> str:
+        """Fill the compiled template for query_type (falls back to 'general')"""
+        compiled = self._compiled_templates.get(query_type) or self._compiled_templates['general']
+        values = {'context': context_text, 'question': question}
+        parts = []
+        for literal, field_name in compiled:
+            parts.append(literal)
+            if field_name is not None:
+                parts.append(values[field_name])
+        return ''.join(parts)
     
     def _format_context(self, context: List[Dict]) -> str:
         """Format retrieved context for prompt"""
@@ -153,19 +244,19 @@ Compare and contrast the relevant information from the context to answer the que
             return "No context available."
         
         formatted = []
+        append = formatted.append
         for i, item in enumerate(context, 1):
             content = item.get('content', '')
-            location = item.get('location', {})
-            score = item.get('score', 0)
+            # No {} defaults - missing locations skip the nested lookups without allocating
+            location = item.get('location')
+            s3_location = location.get('s3Location') if location else None
+            s3_uri = s3_location.get('uri', '') if s3_location else ''
             
-            context_item = f"[Source {i}]"
-            if location:
-                s3_uri = location.get('s3Location', {}).get('uri', '')
-                if s3_uri:
-                    context_item += f" (from {s3_uri})"
-            
-            context_item += f"\n{content}\n"
-            formatted.append(context_item)
+            # One f-string per source rather than a chain of += concatenations
+            if s3_uri:
+                append(f"[Source {i}] (from {s3_uri})\n{content}\n")
+            else:
+                append(f"[Source {i}]\n{content}\n")
         
         return "\n---\n".join(formatted)
     
@@ -188,25 +279,9 @@ Compare and contrast the relevant information from the context to answer the que
         Returns:
             Query type (general, technical, summary, comparison)
         """
-        question_lower = question.lower()
-        
-        # Technical keywords
-        if any(word in question_lower for word in ['how', 'implement', 'configure', 'setup', 'technical', 'specification']):
-            logger.debug(f"Detected query type: technical")
-            return 'technical'
-        
-        # Summary keywords
-        if any(word in question_lower for word in ['summarize', 'summary', 'overview', 'brief']):
-            logger.debug(f"Detected query type: summary")
-            return 'summary'
-        
-        # Comparison keywords
-        if any(word in question_lower for word in ['compare', 'difference', 'versus', 'vs', 'better']):
-            logger.debug(f"Detected query type: comparison")
-            return 'comparison'
-        
-        logger.debug(f"Detected query type: general")
-        return 'general'
+        query_type = classify_query(question)
+        logger.debug("Detected query type: %s", query_type)
+        return query_type
     
     def enhance_query(self, question: str, conversation_history: Optional[List[Dict]] = None) -> str:
         """
@@ -224,17 +299,13 @@ Compare and contrast the relevant information from the context to answer the que
             return question
         
         logger.debug(f"Enhancing query with {len(conversation_history)} previous exchanges")
-        # Add context from recent conversation
-        recent_context = []
-        for item in conversation_history[-3:]:  # Last 3 exchanges
-            recent_context.append(f"Previous question: {item.get('question', '')}")
-            recent_context.append(f"Previous answer: {item.get('answer', '')[:200]}...")
-        
-        if recent_context:
-            enhanced = "Context from previous conversation:\n" + "\n".join(recent_context)
-            enhanced += f"\n\nCurrent question: {question}"
-            logger.debug("Query enhanced with conversation context")
-            return enhanced
+        # Key on the last 3 exchanges as rendered (answers cut to 200 chars), so a
+        # follow-up over the same recent context is a cache hit
+        recent_exchanges = tuple(
+            (item.get('question', ''), item.get('answer', '')[:200])
+            for item in conversation_history[-3:]
+        )
         
-        return question
+        logger.debug("Query enhanced with conversation context")
+        return _render_enhanced_query(question, recent_exchanges)
 
@@ -0,0 +1,29 @@
+"""
+Tests for json_dumps, with and without orjson installed
+"""
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from api import utils
+
+PAYLOAD = {
+    'naive': datetime(2024, 5, 1, 12, 30, 15, 250000),
+    'aware': datetime(2024, 5, 1, 14, 30, tzinfo=timezone(timedelta(hours=2))),
+    'day': date(2024, 5, 1),
+    'rows': [1, 'two', None],
+}
+
+
+def test_fallback_serializes_dates_like_orjson(monkeypatch):
+    pytest.importorskip('orjson')
+    expected = utils.json_dumps(PAYLOAD)
+
+    monkeypatch.setattr(utils, 'orjson', None)
+    assert utils.json_dumps(PAYLOAD) == expected
+
+
+def test_fallback_still_rejects_unknown_types(monkeypatch):
+    monkeypatch.setattr(utils, 'orjson', None)
+    with pytest.raises(TypeError):
+        utils.json_dumps({'x': object()})
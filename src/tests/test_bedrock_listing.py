@@ -0,0 +1,55 @@
+"""
+Tests for the sharded S3 listing behind list_documents/get_status
+"""
+from kb.bedrock import BedrockKnowledgeBase, LIST_SHARD_BOUNDARIES
+
+
+class FakeS3:
+    """In-memory list_objects_v2 with StartAfter and small pages"""
+
+    def __init__(self, keys, page_size=5):
+        self.keys = sorted(keys)
+        self.page_size = page_size
+
+    def _pages(self, Bucket, Prefix, StartAfter=None):
+        keys = [k for k in self.keys if k.startswith(Prefix) and (StartAfter is None or k > StartAfter)]
+        for i in range(0, max(len(keys), 1), self.page_size):
+            chunk = keys[i:i + self.page_size]
+            page = {'IsTruncated': i + self.page_size < len(keys)}
+            if chunk:
+                page['Contents'] = [{'Key': k} for k in chunk]
+            yield page
+
+    def list_objects_v2(self, **kwargs):
+        return next(self._pages(**kwargs))
+
+    def get_paginator(self, name):
+        assert name == 'list_objects_v2'
+        return self
+
+    def paginate(self, **kwargs):
+        return self._pages(**kwargs)
+
+
+def _kb(s3):
+    kb = BedrockKnowledgeBase.__new__(BedrockKnowledgeBase)
+    kb.s3_bucket = 'bucket'
+    kb.__dict__['s3'] = s3
+    return kb
+
+
+def test_single_page_is_returned_without_sharding():
+    keys = ['documents/a.pdf', 'documents/b.pdf']
+    assert [o['Key'] for o in _kb(FakeS3(keys))._list_document_objects()] == keys
+
+
+def test_shards_cover_boundary_and_between_keys_exactly_once():
+    keys = ['documents/', 'documents/0.pdf', 'documents/~last.pdf', 'other/skip.pdf']
+    for bound in LIST_SHARD_BOUNDARIES:
+        # Keys equal to a boundary, just after it, and sorting before it
+        keys += [bound, bound + '.pdf', bound[:-1] + chr(ord(bound[-1]) - 1) + 'z.pdf']
+
+    objects = _kb(FakeS3(keys))._list_document_objects()
+
+    expected = sorted(k for k in set(keys) if k.startswith('documents/'))
+    assert [o['Key'] for o in objects] == expected
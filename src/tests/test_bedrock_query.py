@@ -0,0 +1,102 @@
+"""
+Tests for the model ARN fallback and transient retries in BedrockKnowledgeBase.query
+"""
+import pytest
+from botocore.exceptions import ClientError
+
+from kb.bedrock import BedrockKnowledgeBase, BedrockThrottlingError
+
+CONFIG = {
+    'AWS_REGION': 'us-east-1',
+    'KNOWLEDGE_BASE_ID': 'KB123',
+    'MODEL_ID': 'anthropic.claude-3-5-sonnet-20241022-v2:0',
+}
+
+
+def _client_error(code, message):
+    return ClientError({'Error': {'Code': code, 'Message': message}}, 'RetrieveAndGenerate')
+
+
+class FakeAgent:
+    """retrieve_and_generate that fails the first `failures` calls, recording each model ARN"""
+
+    def __init__(self, failures, error_code='ValidationException'):
+        self.failures = failures
+        self.error_code = error_code
+        self.arns = []
+
+    def retrieve_and_generate(self, **params):
+        self.arns.append(params['retrieveAndGenerateConfiguration']['knowledgeBaseConfiguration']['modelArn'])
+        if len(self.arns) == 1:
+            raise _client_error('ValidationException', 'invalid model identifier')
+        if len(self.arns) <= self.failures:
+            raise _client_error(self.error_code, 'still failing')
+        return {'output': {'text': 'ok'}, 'sessionId': params.get('sessionId', 'new-session')}
+
+
+def _kb(agent):
+    kb = BedrockKnowledgeBase(CONFIG)
+    kb.__dict__['bedrock_agent'] = agent
+    return kb
+
+
+def test_alternatives_are_tried_in_order_until_one_succeeds():
+    agent = FakeAgent(failures=2)
+    kb = _kb(agent)
+
+    result = kb.query('What is in the knowledge base?', session_id='session-1')
+
+    assert result['answer'] == 'ok'
+    assert agent.arns[0] == kb._primary_model_arn
+    alternatives = [arn for arn in kb._alt_model_arns if arn != kb._primary_model_arn]
+    # One call per attempt, in priority order, and nothing after the first success
+    assert agent.arns[1:] == alternatives[:2]
+
+
+def test_throttling_during_fallback_is_raised_as_throttling_error():
+    agent = FakeAgent(failures=2, error_code='ThrottlingException')
+    kb = _kb(agent)
+
+    with pytest.raises(BedrockThrottlingError):
+        kb.query('What is in the knowledge base?')
+
+    assert len(agent.arns) == 2
+
+
+class FlakyAgent:
+    """retrieve_and_generate that raises each queued error once, then succeeds"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def retrieve_and_generate(self, **params):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {'output': {'text': 'ok'}, 'sessionId': 'new-session'}
+
+
+def _http_error(code, status):
+    return ClientError({'Error': {'Code': code, 'Message': 'failed'},
+                        'ResponseMetadata': {'HTTPStatusCode': status}}, 'RetrieveAndGenerate')
+
+
+def test_single_service_unavailable_is_retried(monkeypatch):
+    monkeypatch.setattr('kb.bedrock.time.sleep', lambda seconds: None)
+    agent = FlakyAgent(_http_error('ServiceUnavailableException', 503))
+
+    result = _kb(agent).query('What is in the knowledge base?')
+
+    assert result['answer'] == 'ok'
+    assert agent.calls == 2
+
+
+def test_throttling_is_not_retried(monkeypatch):
+    monkeypatch.setattr('kb.bedrock.time.sleep', lambda seconds: None)
+    agent = FlakyAgent(_http_error('ThrottlingException', 429))
+
+    with pytest.raises(BedrockThrottlingError):
+        _kb(agent).query('What is in the knowledge base?')
+
+    assert agent.calls == 1
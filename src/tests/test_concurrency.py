@@ -0,0 +1,55 @@
+"""
+Tests for the per-client in-flight request limiter (in-process storage)
+"""
+import pytest
+from flask import Flask
+
+from api.concurrency import ConcurrencyLimiter
+
+
+@pytest.fixture
+def limiter():
+    return ConcurrencyLimiter(max_concurrent=1)
+
+
+@pytest.fixture
+def client(limiter):
+    app = Flask(__name__)
+    app.testing = True
+
+    @app.route('/ok')
+    @limiter.limit
+    def ok():
+        return 'ok'
+
+    @app.route('/boom')
+    @limiter.limit
+    def boom():
+        raise RuntimeError('boom')
+
+    return app.test_client()
+
+
+def test_slot_is_released_after_a_request(client, limiter):
+    assert client.get('/ok').status_code == 200
+    assert client.get('/ok').status_code == 200
+    assert limiter._local == {}
+
+
+def test_slot_is_released_when_the_view_raises(client, limiter):
+    with pytest.raises(RuntimeError):
+        client.get('/boom')
+
+    assert limiter._local == {}
+    assert client.get('/ok').status_code == 200
+
+
+def test_request_over_the_limit_gets_429(client, limiter):
+    token = limiter.acquire('127.0.0.1')
+    assert token is not None
+
+    response = client.get('/ok')
+    assert response.status_code == 429
+
+    limiter.release('127.0.0.1', token)
+    assert client.get('/ok').status_code == 200
@@ -0,0 +1,42 @@
+"""
+Tests for ConfigManager numeric coercion and bounds validation
+"""
+import pytest
+
+from config.manager import ConfigManager
+
+
+@pytest.fixture
+def config():
+    return ConfigManager()
+
+
+def test_set_coerces_numeric_settings(config):
+    config.set('MAX_TOKENS', '2048')
+    config.set('TEMPERATURE', 1)
+
+    assert config['MAX_TOKENS'] == 2048
+    assert config['TEMPERATURE'] == 1.0 and isinstance(config['TEMPERATURE'], float)
+    assert config.validate()
+
+
+@pytest.mark.parametrize('key, value', [
+    ('MAX_TOKENS', 'lots'),
+    ('MAX_TOKENS', True),
+    ('TEMPERATURE', None),
+    ('BEDROCK_MAX_RPM', '1.5'),
+])
+def test_set_rejects_values_that_do_not_parse(config, key, value):
+    with pytest.raises(ValueError):
+        config.set(key, value)
+
+
+def test_validate_checks_bounds(config):
+    config.set('TEMPERATURE', 3)
+    with pytest.raises(ValueError, match='TEMPERATURE'):
+        config.validate()
+
+
+def test_non_numeric_settings_are_stored_as_given(config):
+    config.set('MODEL_ID', 'some-model')
+    assert config.get('MODEL_ID') == 'some-model'
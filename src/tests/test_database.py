@@ -0,0 +1,158 @@
+"""
+Tests for the batching writer and keyset-paginated search history
+"""
+import time
+import threading
+
+import pytest
+
+from db.database import Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(str(tmp_path / 'chatbot.db'))
+    yield database
+    database.close()
+
+
+def _record_batches(db, monkeypatch):
+    """Wrap _write_batch so each committed batch's size is recorded"""
+    sizes = []
+    write_batch = db._write_batch
+
+    def recording_write_batch(batch):
+        sizes.append(len(batch))
+        return write_batch(batch)
+
+    monkeypatch.setattr(db, '_write_batch', recording_write_batch)
+    return sizes
+
+
+def _save_query(db, question, sources=None):
+    return db.save_query('session-1', question, 'answer', sources or [], 'model', 'kb', 10)
+
+
+def test_queued_writes_commit_in_one_batch(db, monkeypatch):
+    sizes = _record_batches(db, monkeypatch)
+
+    # Hold the write lock so jobs pile up behind the writer's first transaction
+    with db._write_lock:
+        for i in range(10):
+            db.save_metric('query', {'n': i}, wait=False)
+
+    query_id = _save_query(db, 'after the batch')
+
+    assert query_id is not None
+    assert sum(sizes) == 11
+    assert len(sizes) < 11
+    assert len(db.get_metrics(limit=100)) == 10
+
+
+def test_failed_write_raises_in_caller(db):
+    with pytest.raises(TypeError):
+        _save_query(db, 'unserializable', sources=[object()])
+
+    # The writer survives and keeps serving later writes
+    assert _save_query(db, 'fine') is not None
+
+
+def test_failed_job_does_not_sink_its_batch(db, monkeypatch):
+    sizes = _record_batches(db, monkeypatch)
+    results = {}
+
+    def save(name, sources):
+        try:
+            results[name] = _save_query(db, name, sources=sources)
+        except TypeError as e:
+            results[name] = e
+
+    with db._write_lock:
+        db.save_metric('query', {'n': 1}, wait=False)
+        threads = [threading.Thread(target=save, args=('bad', [object()])),
+                   threading.Thread(target=save, args=('good', []))]
+        for thread in threads:
+            thread.start()
+        # Let both jobs reach the queue before the writer can commit
+        for _ in range(500):
+            if db._write_queue.qsize() >= 2:
+                break
+            time.sleep(0.01)
+    for thread in threads:
+        thread.join(timeout=5)
+
+    # The bad and good jobs were committed together first, then retried one by one
+    assert max(sizes) >= 2
+    assert isinstance(results['bad'], TypeError)
+    assert isinstance(results['good'], int)
+    questions = [row['question'] for row in db.get_search_history()]
+    assert questions == ['good']
+    assert len(db.get_metrics(limit=10)) == 1
+
+
+def test_bulk_query_save_goes_through_the_writer(db, monkeypatch):
+    sizes = _record_batches(db, monkeypatch)
+
+    assert db.save_queries([('session-1', f'q{i}', 'a', [], 'model', 'kb', 1) for i in range(3)]) == 3
+    assert sizes == [1]
+    assert len(db.get_search_history(session_id='session-1')) == 3
+
+
+def test_waiting_write_times_out_when_the_writer_is_stuck(db, monkeypatch):
+    monkeypatch.setattr('db.database.WRITE_TIMEOUT', 0.05)
+
+    with db._write_lock:
+        with pytest.raises(TimeoutError):
+            _save_query(db, 'stuck')
+
+
+def test_summary_read_across_a_write_is_not_cached(db, monkeypatch):
+    get_connection = db._get_connection
+    fired = []
+
+    def racing_get_connection():
+        # Land one write between the summary's read and its cache store
+        if not fired:
+            fired.append(True)
+            threading.Thread(target=_save_query, args=(db, 'concurrent')).start()
+            while db._summary_generation == 0:
+                time.sleep(0.01)
+        return get_connection()
+
+    monkeypatch.setattr(db, '_get_connection', racing_get_connection)
+    db.get_metrics_summary()
+
+    assert db._summary_cache == {}
+    assert db.get_metrics_summary()['total_queries'] == 1
+
+
+def test_history_cursor_pages_through_every_row_once(db):
+    # Rows inserted together share created_at, so the id tiebreak is exercised
+    db.save_queries([('session-1', f'q{i}', 'a', [], 'model', 'kb', 1) for i in range(8)])
+    all_ids = [row['id'] for row in db.get_search_history(session_id='session-1')]
+
+    seen, cursor = [], None
+    while True:
+        page = db.get_search_history(session_id='session-1', limit=3, cursor=cursor)
+        seen.extend(row['id'] for row in page)
+        cursor = Database.next_history_cursor(page[-1] if page else None, len(page), 3)
+        if cursor is None:
+            break
+
+    assert seen == all_ids
+    assert all_ids == sorted(all_ids, reverse=True)
+
+
+def test_history_cursor_after_exactly_full_last_page(db):
+    db.save_queries([('session-1', f'q{i}', 'a', [], 'model', 'kb', 1) for i in range(4)])
+
+    page = db.get_search_history(session_id='session-1', limit=2)
+    cursor = Database.next_history_cursor(page[-1], len(page), 2)
+    page = db.get_search_history(session_id='session-1', limit=2, cursor=cursor)
+    cursor = Database.next_history_cursor(page[-1], len(page), 2)
+    assert cursor is not None
+
+    # A full final page still yields a cursor; the page after it is empty and ends paging
+    page = db.get_search_history(session_id='session-1', limit=2, cursor=cursor)
+    assert page == []
+    assert Database.next_history_cursor(None, 0, 2) is None
@@ -0,0 +1,50 @@
+"""
+Tests for the client-side Bedrock throttle
+"""
+from collections import deque
+
+from kb.throttle import AdaptiveThrottle
+
+
+def test_acquire_times_out_when_all_slots_are_taken():
+    throttle = AdaptiveThrottle(max_concurrency=1, acquire_timeout=0.05)
+
+    assert throttle.acquire()
+    assert not throttle.acquire()
+
+    throttle.release()
+    assert throttle.acquire()
+
+
+def test_rpm_window_blocks_until_calls_age_out():
+    throttle = AdaptiveThrottle(max_concurrency=4, requests_per_minute=2, acquire_timeout=0.05)
+
+    for _ in range(2):
+        assert throttle.acquire()
+        throttle.on_success()
+    assert not throttle.acquire()
+
+    # Age the recorded calls past the 60s window
+    throttle._calls = deque(t - 61 for t in throttle._calls)
+    assert throttle.acquire()
+
+
+def test_throttling_halves_concurrency_and_success_recovers_it():
+    throttle = AdaptiveThrottle(max_concurrency=8)
+
+    throttle.acquire()
+    throttle.on_throttle()
+    assert throttle.concurrency == 4
+
+    throttle.acquire()
+    throttle.on_success()
+    assert throttle.concurrency == 4.5
+    assert throttle.in_flight == 0
+
+
+def test_invalid_limits_are_clamped():
+    throttle = AdaptiveThrottle(max_concurrency=0, requests_per_minute=-1, acquire_timeout=0.05)
+
+    assert throttle.max_concurrency == 1
+    assert throttle.requests_per_minute == 0
+    assert throttle.acquire()